@@ -14,13 +14,14 @@ import time
 import random
 import re
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import argparse
 
 class DragDropAudioGenerator:
     def __init__(self):
         self.tts_url = "http://127.0.0.1:5001"
         self.output_dir = "audio_outputs"
+        self.poll_interval = 2  # 任务状态轮询间隔（秒）
         
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
@@ -193,10 +194,12 @@ class DragDropAudioGenerator:
                 "discount": "Special offer available!"
             }
             
-            response = requests.post(f"{self.tts_url}/generate", json=tts_data, timeout=300)
+            response = requests.post(f"{self.tts_url}/jobs", json=tts_data, timeout=30)
             
-            if response.status_code == 200:
-                result = response.json()
+            if response.status_code == 202:
+                result = self.wait_for_job(response.json()['job_id'])
+                if result is None:
+                    return {'success': False, 'error': 'TTS任务执行失败'}
                 return {
                     'success': True,
                     'product_name': product_name,
@@ -212,6 +215,29 @@ class DragDropAudioGenerator:
         except Exception as e:
             return {'success': False, 'error': f'生成失败: {str(e)}'}
 
+    def wait_for_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """轮询TTS异步任务直到结束，返回最终结果"""
+        while True:
+            response = requests.get(f"{self.tts_url}/jobs/{job_id}", timeout=10)
+            response.raise_for_status()
+            job = response.json()
+            
+            print(f"   - 进度: {job['completed']}/{job['total_scripts']} ({job['progress_percent']}%)", end='\r')
+            
+            if job['status'] == 'completed':
+                print()
+                return job.get('result')
+            if job['status'] == 'failed':
+                print()
+                print(f"❌ TTS任务失败: {job.get('error', '未知错误')}")
+                return None
+            if job['status'] == 'cancelled':
+                print()
+                print(f"⚠️ TTS任务已取消: 已完成 {job['completed']}/{job['total_scripts']} 条")
+                return None
+            
+            time.sleep(self.poll_interval)
+
     def process_file(self, filepath: str) -> Dict[str, Any]:
         """处理单个文件"""
         print(f"\n📄 处理: {os.path.basename(filepath)}")
@@ -23,6 +23,7 @@ class ExcelToAudioGenerator:
     def __init__(self):
         self.tts_url = "http://127.0.0.1:5001"
         self.output_dir = "audio_outputs"
+        self.poll_interval = 2  # 任务状态轮询间隔（秒）
         self.temp_dir = "temp_excel"
         
         # 确保目录存在
@@ -444,13 +445,18 @@ class ExcelToAudioGenerator:
             }
             
             response = requests.post(
-                f"{self.tts_url}/generate",
+                f"{self.tts_url}/jobs",
                 json=tts_data,
-                timeout=300
+                timeout=30
             )
             
-            if response.status_code == 200:
-                result = response.json()
+            if response.status_code == 202:
+                result = self.wait_for_job(response.json()['job_id'])
+                if result is None:
+                    return {
+                        'success': False,
+                        'error': 'TTS任务执行失败'
+                    }
                 
                 # 生成音频参数报告
                 audio_params = []
@@ -489,6 +495,29 @@ class ExcelToAudioGenerator:
                 'error': f'生成音频失败: {str(e)}'
             }
 
+    def wait_for_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """轮询TTS异步任务直到结束，返回最终结果"""
+        while True:
+            response = requests.get(f"{self.tts_url}/jobs/{job_id}", timeout=10)
+            response.raise_for_status()
+            job = response.json()
+            
+            print(f"   - 进度: {job['completed']}/{job['total_scripts']} ({job['progress_percent']}%)", end='\r')
+            
+            if job['status'] == 'completed':
+                print()
+                return job.get('result')
+            if job['status'] == 'failed':
+                print()
+                print(f"❌ TTS任务失败: {job.get('error', '未知错误')}")
+                return None
+            if job['status'] == 'cancelled':
+                print()
+                print(f"⚠️ TTS任务已取消: 已完成 {job['completed']}/{job['total_scripts']} 条")
+                return None
+            
+            time.sleep(self.poll_interval)
+
     def save_generation_report(self, result: Dict[str, Any], original_file: str):
         """保存生成报告"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -4,14 +4,36 @@ TT-Live-AI A3-TK 口播生成系统 - Flask 主服务
 支持批量语音生成、多产品并行处理、自动参数映射
 """
 import os
+import re
+import sys
 import json
+import atexit
+import random
+import shutil
+import hashlib
+import multiprocessing
 import asyncio
+import contextvars
+import queue
+import threading
+import time
+import uuid
 import edge_tts
-import pandas as pd
+from openpyxl import Workbook
 from datetime import datetime
-from flask import Flask, request, jsonify
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
+from flask import Flask, Response, request, jsonify
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, CancelledError as FutureCancelledError
 import logging
+try:
+    import fcntl  # 音频缓存的跨进程文件锁（Windows 上不可用）
+except ImportError:
+    fcntl = None
+
+# 共享语音目录（edgetts-integration/voice_catalog.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voice_catalog import VOICE_CATALOG, VOICE_MODELS, EMOTION_VOICE_MAPPING
+from edge_connection import get_shared_connector, close_shared_connector, connector_stats
 
 # 配置日志
 logging.basicConfig(
@@ -27,60 +49,380 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 
 # 系统配置
-MAX_CONCURRENT = 5  # 最大并发处理数
+# 上游并发由 AIMD 自适应限流器控制，在 [MIN_CONCURRENT, MAX_CONCURRENT] 之间动态调整
+INITIAL_CONCURRENT = int(os.environ.get("TTS_INITIAL_CONCURRENT", "5"))  # 初始并发数
+MIN_CONCURRENT = int(os.environ.get("TTS_MIN_CONCURRENT", "2"))  # 最小并发数
+MAX_CONCURRENT = int(os.environ.get("TTS_MAX_CONCURRENT", "32"))  # 最大并发处理数
+CONCURRENCY_LATENCY_TOLERANCE = 2.0  # 延迟超过基线的倍数时视为拥塞
+CONCURRENCY_DECREASE_FACTOR = 0.7  # 拥塞或失败时的乘性降低系数
 
-# 语音参数映射表（TT-Live-AI 标准）
-EMOTION_PARAMS = {
-    "Excited": {"rate": "+15%", "pitch": "+12Hz", "volume": "+15%"},
-    "Confident": {"rate": "+8%", "pitch": "+5Hz", "volume": "+8%"},
-    "Empathetic": {"rate": "-12%", "pitch": "-8Hz", "volume": "-10%"},
-    "Calm": {"rate": "-10%", "pitch": "-3Hz", "volume": "+0%"},
-    "Playful": {"rate": "+18%", "pitch": "+15Hz", "volume": "+5%"},
-    "Urgent": {"rate": "+22%", "pitch": "+8Hz", "volume": "+18%"},
-    "Authoritative": {"rate": "+5%", "pitch": "+3Hz", "volume": "+10%"},
-    "Friendly": {"rate": "+12%", "pitch": "+8Hz", "volume": "+5%"},
-    "Inspirational": {"rate": "+10%", "pitch": "+10Hz", "volume": "+12%"},
-    "Serious": {"rate": "+0%", "pitch": "+0Hz", "volume": "+5%"},
-    "Mysterious": {"rate": "-8%", "pitch": "+5Hz", "volume": "-5%"},
-    "Grateful": {"rate": "+5%", "pitch": "+8Hz", "volume": "+8%"}
-}
+# 优先级通道：interactive（试听/预览）始终先于 batch（批量任务）获得名额
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITY_CLASSES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)  # 按优先级从高到低
+INTERACTIVE_RESERVED_SLOTS = int(os.environ.get("TTS_INTERACTIVE_RESERVED", "1"))  # 批量任务不可占用的保留名额
+INTERACTIVE_MAX_SCRIPTS = int(os.environ.get("TTS_INTERACTIVE_MAX_SCRIPTS", "3"))  # 未指定优先级时，不超过该脚本数的同步请求按交互处理
 
-# 语音模型池（支持多种语音模型）
-VOICE_MODELS = {
-    # 女性语音模型
-    "en-US-AmandaMultilingualNeural": {"gender": "女性", "style": "Clear, Bright, Youthful", "name": "阿曼达", "description": "清晰、明亮、年轻"},
-    "en-US-AriaNeural": {"gender": "女性", "style": "Crisp, Bright, Clear", "name": "阿里亚", "description": "清脆、明亮、清晰"},
-    "en-US-AvaNeural": {"gender": "女性", "style": "Pleasant, Friendly, Caring", "name": "艾娃", "description": "令人愉悦、友好、关怀"},
-    "en-US-EmmaNeural": {"gender": "女性", "style": "Cheerful, Light-Hearted, Casual", "name": "艾玛", "description": "快乐、轻松、随意"},
-    "en-US-JennyNeural": {"gender": "女性", "style": "Sincere, Pleasant, Approachable", "name": "珍妮", "description": "真诚、愉快、易接近"},
-    "en-US-MichelleNeural": {"gender": "女性", "style": "Confident, Authentic, Warm", "name": "米歇尔", "description": "自信、真实、温暖"},
-    "en-US-NancyNeural": {"gender": "女性", "style": "Confident, Serious, Mature", "name": "南希", "description": "自信、严肃、成熟"},
-    "en-US-SerenaNeural": {"gender": "女性", "style": "Formal, Confident, Mature", "name": "塞雷娜", "description": "正式、自信、成熟"},
-    "en-US-AshleyNeural": {"gender": "女性", "style": "Sincere, Approachable, Honest", "name": "阿什莉", "description": "真诚、易接近、诚实"},
-    
-    # 男性语音模型
-    "en-US-BrandonNeural": {"gender": "男性", "style": "Warm, Engaging, Authentic", "name": "布兰登", "description": "温暖、吸引人、真实"},
-    "en-US-KaiNeural": {"gender": "男性", "style": "Sincere, Pleasant, Bright, Clear, Friendly, Warm", "name": "凯", "description": "真诚、愉快、明亮、清晰、友好、温暖"},
-    "en-US-DavisNeural": {"gender": "男性", "style": "Soothing, Calm, Smooth", "name": "戴维斯", "description": "抚慰、平静、顺畅"},
-    
-    # 中性语音模型
-    "en-US-FableNeural": {"gender": "中性", "style": "Casual, Friendly", "name": "传奇", "description": "随意、友好"}
-}
+# 租户公平调度：同一优先级内按权重在租户（X-Tenant 请求头 / tenant 字段 / 产品名）之间分配名额
+DEFAULT_TENANT = "default"
+DEFAULT_TENANT_WEIGHT = 1.0
+
+def parse_named_numbers(value, cast=float, minimum=0.01):
+    """解析 "名称A=3,名称B=0.5" 形式的配置（租户权重、语音并发上限等）"""
+    numbers = {}
+    for item in (value or "").split(","):
+        name, sep, number = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            numbers[name.strip()] = max(cast(number), minimum)
+        except ValueError:
+            logger.warning(f"忽略无效的配置项: {item}")
+    return numbers
+
+TENANT_WEIGHTS = parse_named_numbers(os.environ.get("TTS_TENANT_WEIGHTS", ""))
+
+# 单个语音的并发子上限（同一语音的请求过于集中时更容易被上游限流），0 表示只受总预算限制
+VOICE_MAX_CONCURRENT = int(os.environ.get("TTS_VOICE_MAX_CONCURRENT", "0"))
+VOICE_CONCURRENCY_LIMITS = parse_named_numbers(os.environ.get("TTS_VOICE_LIMITS", ""), int, 1)  # "en-US-JennyNeural=4,..."
+
+# 上游合成重试与熔断配置
+SYNTH_MAX_ATTEMPTS = int(os.environ.get("TTS_SYNTH_MAX_ATTEMPTS", "4"))  # 单条脚本最多尝试次数
+SYNTH_ATTEMPT_TIMEOUT = float(os.environ.get("TTS_SYNTH_ATTEMPT_TIMEOUT", "60"))  # 单次尝试超时（秒）
+SYNTH_DEADLINE = float(os.environ.get("TTS_SYNTH_DEADLINE", "180"))  # 单条脚本从首次拿到名额起、含全部重试的期限（秒），0 表示不限
+BATCH_DEADLINE = float(os.environ.get("TTS_BATCH_DEADLINE", "0"))  # 整批默认期限（秒），0 表示不限；请求可用 deadline_seconds 覆盖
+SYNTH_BACKOFF_BASE = 0.5  # 指数退避基数（秒）
+SYNTH_BACKOFF_MAX = 20.0  # 单次退避上限（秒）
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("TTS_CIRCUIT_FAILURE_THRESHOLD", "10"))  # 连续失败多少次后熔断
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get("TTS_CIRCUIT_RESET_TIMEOUT", "30"))  # 熔断后暂停多久再试探（秒）
+
+# 多进程工作池配置（0 表示单进程模式）
+WORKER_PROCESSES = int(os.environ.get("TTS_WORKERS", "0"))  # 工作进程数
+WORKER_SHARD_SIZE = int(os.environ.get("TTS_WORKER_SHARD_SIZE", "50"))  # 每个分片的脚本数上限
+WORKER_MIN_BATCH = int(os.environ.get("TTS_WORKER_MIN_BATCH", "20"))  # 少于该数量的批次直接在主进程处理
+WORKER_CANCEL_POLL_INTERVAL = 0.2  # 工作进程检查批次取消标志的间隔（秒）
+
+# 断点清单目录（位于产品输出目录下）
+CHECKPOINT_DIR_NAME = ".checkpoints"
+
+# 音频缓存配置（按 文本+语音+韵律参数 内容寻址）
+AUDIO_CACHE_ENABLED = os.environ.get("TTS_AUDIO_CACHE_ENABLED", "1") != "0"
+AUDIO_CACHE_DIR = os.environ.get("TTS_AUDIO_CACHE_DIR", "cache/audio")
+AUDIO_CACHE_MAX_BYTES = int(os.environ.get("TTS_AUDIO_CACHE_MAX_MB", "2048")) * 1024 * 1024
+AUDIO_CACHE_SYNC_FRACTION = 0.05  # 本进程写入超过容量的该比例后重新统计目录占用（多进程共用目录）
+
+# 长脚本分段并行合成配置（请求中 "chunked": true/false 可覆盖默认开关）
+CHUNKED_SYNTHESIS = os.environ.get("TTS_CHUNKED_SYNTHESIS", "0") == "1"
+CHUNK_MIN_WORDS = int(os.environ.get("TTS_CHUNK_MIN_WORDS", "60"))  # 超过该词数的脚本才分段
+CHUNK_TARGET_WORDS = int(os.environ.get("TTS_CHUNK_TARGET_WORDS", "35"))  # 每段目标词数
+EDGE_MP3_BYTES_PER_SECOND = 48000 // 8  # edge-tts 默认输出 audio-24khz-48kbitrate-mono-mp3（恒定码率）
+
+# 语音选择：rotate 按脚本序号轮换情绪候选语音；adaptive 按各语音实时延迟与错误率分配，并保留多样性配额
+VOICE_SELECTION = os.environ.get("TTS_VOICE_SELECTION", "rotate").lower()
+VOICE_MIN_SHARE = float(os.environ.get("TTS_VOICE_MIN_SHARE", "0.2"))  # 批内每个健康候选语音至少分到的脚本比例
+VOICE_HEALTH_MIN_SAMPLES = 5  # 语音至少有多少次合成结果后才参与按延迟分配
+VOICE_DEGRADED_ERROR_RATE = 0.5  # 错误率（EWMA）超过该值视为故障，不再分配
+VOICE_DEGRADED_LATENCY_FACTOR = 3.0  # 延迟超过最快候选语音该倍数时视为过慢，不再分配
+
+# 对冲请求配置：单次合成超过该语音近期 p95 延迟时再发一个相同请求，先完成者胜出
+HEDGING_ENABLED = os.environ.get("TTS_HEDGING", "0") == "1"
+HEDGE_MAX_RATIO = float(os.environ.get("TTS_HEDGE_MAX_RATIO", "0.1"))  # 对冲请求数不超过主请求数的比例（额外负载上限）
+HEDGE_PERCENTILE = 0.95  # 触发对冲的延迟百分位
+HEDGE_MIN_SAMPLES = 20  # 某语音至少有多少个延迟样本后才启用对冲
+HEDGE_MIN_DELAY = 0.5  # 对冲等待下限（秒），避免样本偏小时过早对冲
+HEDGE_WINDOW = 200  # 每个语音保留的最近延迟样本数
+
+# 字幕配置（请求中 "subtitles": "srt" / "vtt" / false 可覆盖默认值）
+SUBTITLE_FORMATS = ("srt", "vtt")
+SUBTITLE_DEFAULT_FORMAT = os.environ.get("TTS_SUBTITLES", "").lower() or None  # 为空时默认不生成字幕
+SUBTITLE_MAX_WORDS = 7  # 每条字幕最多词数
+SUBTITLE_MAX_SECONDS = 3.0  # 每条字幕最长显示时间（秒）
+
+
+class BackgroundEventLoop:
+    """常驻后台事件循环 - 服务内所有请求共享同一个 asyncio 循环
+
+    Flask 工作线程通过 submit/run 把协程投递到该循环执行，
+    连接、缓存、信号量等异步资源可以在请求之间复用。
+    """
+
+    def __init__(self, name="tts-event-loop"):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """获取后台循环（首次访问时启动）"""
+        return self.start()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动后台循环线程（幂等）"""
+        with self._lock:
+            if self._loop is not None and self.is_running():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name=self.name, daemon=True)
+            thread.start()
+            ready.wait()
+
+            self._loop = loop
+            self._thread = thread
+            logger.info(f"后台事件循环已启动: {self.name}")
+            return loop
+
+    def submit(self, coro):
+        """投递协程到后台循环，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """投递协程并阻塞等待结果"""
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        """停止后台循环并取消未完成的任务"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is None:
+            return
+
+        async def _shutdown():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await close_shared_connector()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), loop).result(5)
+        except Exception as e:
+            logger.warning(f"关闭后台事件循环时出错: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not thread.is_alive():
+            loop.close()
+        logger.info(f"后台事件循环已停止: {self.name}")
+
+
+# 服务级事件循环（所有 /generate 请求共享）
+SERVICE_LOOP = BackgroundEventLoop()
+atexit.register(SERVICE_LOOP.stop)
+
+# 运行指标配置（Prometheus 文本格式，由 /metrics 暴露）
+METRICS_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 120.0)
+METRICS_BATCH_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+def format_metric_labels(label_names, label_values, extra=None):
+    """生成 {name="value",...} 标签串（按 Prometheus 规则转义）"""
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+def format_metric_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Metric:
+    """单个指标族 - 支持 counter / gauge / histogram 三种类型
+
+    gauge / counter 可以传入 callback，在导出时读取实时值（如在途请求数）；带标签时 callback
+    返回 {标签值元组: 数值}。
+    """
+    
+    def __init__(self, name, help_text, kind, label_names=(), buckets=None, callback=None):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets) if buckets else ()
+        self.callback = callback
+        self._values = {}  # 标签值元组 -> 数值，histogram 为 [各桶计数, 总和, 总数]
+        self._lock = threading.Lock()
+    
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+    
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+    
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+    
+    def snapshot(self):
+        """导出当前数值的副本（可跨进程传递）"""
+        with self._lock:
+            if self.kind == "histogram":
+                return {key: [list(counts), total, count] for key, (counts, total, count) in self._values.items()}
+            return dict(self._values)
+    
+    def render(self, remote_snapshots=()):
+        """生成 Prometheus 文本格式，remote_snapshots 为工作进程上报的同名指标"""
+        if self.callback is not None:
+            values = self.callback() if self.label_names else {(): self.callback()}
+        else:
+            values = self.snapshot()
+            for remote in remote_snapshots:
+                for key, value in remote.items():
+                    if self.kind != "histogram":
+                        values[key] = values.get(key, 0) + value
+                    elif key not in values:
+                        values[key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        local = values[key]
+                        local[0] = [a + b for a, b in zip(local[0], value[0])]
+                        local[1] += value[1]
+                        local[2] += value[2]
+        
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key in sorted(values):
+            value = values[key]
+            if self.kind == "histogram":
+                counts, total, count = value
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = format_metric_labels(self.label_names, key, ("le", format_metric_value(float(bound))))
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = format_metric_labels(self.label_names, key, ("le", "+Inf"))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = format_metric_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {format_metric_value(float(total))}")
+                lines.append(f"{self.name}_count{labels} {count}")
+            else:
+                labels = format_metric_labels(self.label_names, key)
+                lines.append(f"{self.name}{labels} {format_metric_value(value)}")
+        return lines
+
+class MetricsRegistry:
+    """指标注册表 - 汇总本进程与各工作进程的指标"""
+    
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._remote = {}  # pid -> {指标名: 快照}
+        self._lock = threading.Lock()
+    
+    def counter(self, name, help_text, label_names=(), callback=None):
+        return self._register(Metric(name, help_text, "counter", label_names, callback=callback))
+    
+    def gauge(self, name, help_text, label_names=(), callback=None):
+        return self._register(Metric(name, help_text, "gauge", label_names, callback=callback))
+    
+    def histogram(self, name, help_text, label_names=(), buckets=METRICS_LATENCY_BUCKETS):
+        return self._register(Metric(name, help_text, "histogram", label_names, buckets=buckets))
+    
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def snapshot(self):
+        """本进程累计指标（不含回调型 gauge），供工作进程回传主进程"""
+        return {name: metric.snapshot() for name, metric in self._metrics.items() if metric.callback is None}
+    
+    def merge_remote(self, pid, snapshot):
+        """记录工作进程的最新累计快照（每个进程只保留最新一份）"""
+        with self._lock:
+            self._remote[pid] = snapshot
+    
+    def render(self):
+        with self._lock:
+            remotes = list(self._remote.values())
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.extend(metric.render([remote[name] for remote in remotes if name in remote]))
+        return "\n".join(lines) + "\n"
+
+METRICS = MetricsRegistry()
+METRIC_SYNTH_SECONDS = METRICS.histogram("tts_synthesis_seconds", "单条脚本合成耗时（含重试，不含缓存命中）", ("voice", "emotion"))
+METRIC_SYNTH_TOTAL = METRICS.counter("tts_synthesis_total", "合成结果计数（success / failure / cache_hit）", ("voice", "emotion", "outcome"))
+METRIC_RETRIES_TOTAL = METRICS.counter("tts_synthesis_retries_total", "上游合成重试次数", ("mode",))
+METRIC_AUDIO_BYTES = METRICS.counter("tts_audio_bytes_total", "产出的音频字节数", ("voice", "source"))
+METRIC_LIMITER_WAIT = METRICS.histogram("tts_limiter_wait_seconds", "等待上游并发名额的时间", ("priority",), buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0))
+METRIC_BATCH_SECONDS = METRICS.histogram("tts_batch_duration_seconds", "批次总耗时", ("mode",), buckets=METRICS_BATCH_BUCKETS)
+METRIC_BATCH_SCRIPTS = METRICS.counter("tts_batch_scripts_total", "批次处理的脚本数", ("outcome",))
+
+class ProsodyParams:
+    """语音韵律参数（整数）- rate / volume 单位为 %，pitch 单位为 Hz
 
-# 情绪与语音模型映射
-EMOTION_VOICE_MAPPING = {
-    "Excited": ["en-US-AriaNeural", "en-US-EmmaNeural", "en-US-MichelleNeural"],
-    "Confident": ["en-US-NancyNeural", "en-US-SerenaNeural", "en-US-BrandonNeural"],
-    "Empathetic": ["en-US-AvaNeural", "en-US-JennyNeural", "en-US-AshleyNeural"],
-    "Calm": ["en-US-DavisNeural", "en-US-AvaNeural", "en-US-JennyNeural"],
-    "Playful": ["en-US-EmmaNeural", "en-US-AriaNeural", "en-US-FableNeural"],
-    "Urgent": ["en-US-MichelleNeural", "en-US-NancyNeural", "en-US-BrandonNeural"],
-    "Authoritative": ["en-US-SerenaNeural", "en-US-NancyNeural", "en-US-BrandonNeural"],
-    "Friendly": ["en-US-JennyNeural", "en-US-AvaNeural", "en-US-KaiNeural"],
-    "Inspirational": ["en-US-MichelleNeural", "en-US-BrandonNeural", "en-US-AriaNeural"],
-    "Serious": ["en-US-SerenaNeural", "en-US-NancyNeural", "en-US-DavisNeural"],
-    "Mysterious": ["en-US-DavisNeural", "en-US-SerenaNeural", "en-US-AvaNeural"],
-    "Grateful": ["en-US-JennyNeural", "en-US-AvaNeural", "en-US-AshleyNeural"]
+    参数表只保存整数，扰动总是返回新对象；只在调用 edge-tts 前由 to_edge_tts()
+    格式化为 "+15%" / "+12Hz" 形式的字符串。
+    """
+    __slots__ = ("rate", "pitch", "volume")
+    
+    def __init__(self, rate, pitch, volume):
+        self.rate = rate
+        self.pitch = pitch
+        self.volume = volume
+    
+    def with_variation(self, rng=None):
+        """返回添加 ±2 随机扰动后的副本（rate 与 pitch，volume 保持不变）"""
+        if rng is None:
+            rng = random
+        rate = self.rate + rng.randint(-2, 2)
+        pitch = self.pitch + rng.randint(-2, 2)
+        return ProsodyParams(rate, pitch, self.volume)
+    
+    def to_edge_tts(self):
+        """格式化为 edge-tts 参数字符串"""
+        return {
+            "rate": f"{self.rate:+d}%",
+            "pitch": f"{self.pitch:+d}Hz",
+            "volume": f"{self.volume:+d}%"
+        }
+    
+    def __repr__(self):
+        return f"ProsodyParams(rate={self.rate}, pitch={self.pitch}, volume={self.volume})"
+
+# 语音参数映射表（TT-Live-AI 标准，rate / volume 为 %，pitch 为 Hz）
+EMOTION_PARAMS = {
+    "Excited": ProsodyParams(15, 12, 15),
+    "Confident": ProsodyParams(8, 5, 8),
+    "Empathetic": ProsodyParams(-12, -8, -10),
+    "Calm": ProsodyParams(-10, -3, 0),
+    "Playful": ProsodyParams(18, 15, 5),
+    "Urgent": ProsodyParams(22, 8, 18),
+    "Authoritative": ProsodyParams(5, 3, 10),
+    "Friendly": ProsodyParams(12, 8, 5),
+    "Inspirational": ProsodyParams(10, 10, 12),
+    "Serious": ProsodyParams(0, 0, 5),
+    "Mysterious": ProsodyParams(-8, 5, -5),
+    "Grateful": ProsodyParams(5, 8, 8)
 }
 
 # 默认语音模型
@@ -95,15 +437,181 @@ def get_voice_for_emotion(emotion, script_index=0):
         return voices[voice_index]
     return DEFAULT_VOICE
 
+class VoiceHealthTracker:
+    """按语音统计上游合成的实时延迟与错误率（指数加权，延迟按每 100 字符归一化）"""
+    
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self._voices = {}  # 语音 -> {"latency": ..., "error_rate": ..., "samples": ...}
+        self._lock = threading.Lock()
+    
+    def observe(self, voice, seconds, text_length, success):
+        with self._lock:
+            entry = self._voices.get(voice)
+            if entry is None:
+                entry = self._voices[voice] = {"latency": None, "error_rate": 0.0, "samples": 0}
+            entry["samples"] += 1
+            entry["error_rate"] += ((0.0 if success else 1.0) - entry["error_rate"]) * self.alpha
+            if success:
+                normalized = seconds / max(text_length, 1) * 100
+                entry["latency"] = normalized if entry["latency"] is None else entry["latency"] + (normalized - entry["latency"]) * self.alpha
+    
+    def get(self, voice):
+        """样本足够时返回 (归一化延迟, 错误率)，否则返回 None"""
+        entry = self._voices.get(voice)
+        if entry is None or entry["samples"] < VOICE_HEALTH_MIN_SAMPLES:
+            return None
+        return entry["latency"], entry["error_rate"]
+    
+    def stats(self):
+        with self._lock:
+            return {
+                voice: {
+                    "latency_per_100_chars": round(entry["latency"], 4) if entry["latency"] is not None else None,
+                    "error_rate": round(entry["error_rate"], 4),
+                    "samples": entry["samples"]
+                }
+                for voice, entry in self._voices.items()
+            }
+
+VOICE_HEALTH = VoiceHealthTracker()
+
+class AdaptiveVoiceSelector:
+    """批内自适应语音选择（TTS_VOICE_SELECTION=adaptive 时每个批次一个实例）
+
+    在情绪的候选语音中排除故障或明显过慢的语音，其余按 1/延迟 加权分配；
+    已分配数低于 VOICE_MIN_SHARE 配额的语音优先，保证多样性。没有延迟数据时
+    各语音权重相同，效果与轮换一致。choose() 在组进入 DispatchWindow 时调用，
+    每次选择都基于当时最新的统计。
+    """
+    
+    def __init__(self, health=VOICE_HEALTH, min_share=VOICE_MIN_SHARE):
+        self.health = health
+        self.min_share = min_share
+        self.counts = {}  # 情绪 -> {语音: 已分配数}
+    
+    def _weights(self, candidates):
+        stats = {voice: self.health.get(voice) for voice in candidates}
+        latencies = [stat[0] for stat in stats.values() if stat is not None and stat[0]]
+        fastest = min(latencies) if latencies else None
+        default_latency = sum(latencies) / len(latencies) if latencies else 1.0
+        weights = {}
+        for voice, stat in stats.items():
+            if stat is not None:
+                latency, error_rate = stat
+                if error_rate > VOICE_DEGRADED_ERROR_RATE:
+                    continue
+                if latency and fastest and latency > fastest * VOICE_DEGRADED_LATENCY_FACTOR:
+                    continue
+                weights[voice] = (1.0 - error_rate) / (latency or default_latency)
+            else:
+                weights[voice] = 1.0 / default_latency
+        # 全部候选都不健康时仍按轮换分配
+        return weights or {voice: 1.0 for voice in candidates}
+    
+    def choose(self, emotion, preferred=None):
+        """为一条脚本选择语音；preferred 为断点清单中已用过的语音（仍属候选时沿用）"""
+        candidates = EMOTION_VOICE_MAPPING.get(emotion)
+        if not candidates:
+            return DEFAULT_VOICE
+        counts = self.counts.setdefault(emotion, {voice: 0 for voice in candidates})
+        if preferred in counts:
+            counts[preferred] += 1
+            return preferred
+        
+        weights = self._weights(candidates)
+        total = sum(counts.values()) + 1
+        behind = [voice for voice in weights if counts[voice] < self.min_share * total]
+        voice = min(behind or weights, key=lambda v: (counts[v] + 1) / weights[v])
+        counts[voice] += 1
+        return voice
+
+class DispatchWindow:
+    """批内派发窗口：同时派发的组数不超过上游当前可用名额（按 FIFO 放行）
+
+    自适应语音选择在组进入窗口时才选语音，后派发的组能用上本批前面的合成统计，
+    批次中途变慢或故障的语音也能及时绕开。
+    """
+    
+    def __init__(self, limiter=None, priority=None):
+        self.limiter = limiter
+        self.priority = priority
+        self.active = 0
+        self._waiters = deque()
+    
+    def size(self):
+        limiter = self.limiter or UPSTREAM_LIMITER
+        return limiter.capacity(self.priority or SYNTH_PRIORITY.get())
+    
+    def _wake(self):
+        # 名额直接转交给排队者，避免新来的组插队
+        while self._waiters and self.active < self.size():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+    
+    async def __aenter__(self):
+        if not self._waiters and self.active < self.size():
+            self.active += 1
+            return self
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已转交但任务被取消，归还名额
+                self.active -= 1
+                self._wake()
+            raise
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self.active -= 1
+        self._wake()
+
 def get_voice_info(voice_model):
-    """获取语音模型信息"""
+    """获取语音模型信息（人工整理的语音优先，其余取自语音目录）"""
     if voice_model in VOICE_MODELS:
         return VOICE_MODELS[voice_model]
-    return {"gender": "未知", "style": "未知", "name": "未知", "description": "未知"}
+    info = VOICE_CATALOG.describe(voice_model) if voice_model else None
+    if not info:
+        return {"gender": "未知", "style": "未知", "name": "未知", "description": "未知"}
+    # 目录中的 FriendlyName 较长且含空格，名称改用语音短名（用于音频文件名）
+    info["full_name"] = info.get("name")
+    info["name"] = VOICE_CATALOG.short_label(voice_model)
+    return info
 
 def list_available_voices():
     """列出所有可用的语音模型"""
-    return list(VOICE_MODELS.keys())
+    return list(VOICE_CATALOG.voices().keys())
+
+def requested_voice(voice):
+    """校验请求指定的语音（本地目录查询）；未指定、默认语音或未知语音返回 None，表示按情绪动态选择"""
+    if voice and voice != DEFAULT_VOICE and not VOICE_CATALOG.is_known(voice):
+        logger.warning(f"未知语音 {voice}，改用情绪推荐语音")
+        voice = None
+    if not voice or voice == DEFAULT_VOICE:
+        return None
+    return voice
+
+def emotion_voices(emotion):
+    """情绪的候选语音（动态选择的范围）"""
+    return EMOTION_VOICE_MAPPING.get(emotion) or [DEFAULT_VOICE]
+
+def resolve_voice(voice, emotion, script_index=0, selector=None, preferred=None):
+    """校验语音（本地目录查询），未指定或未知语音时按情绪动态选择
+
+    selector: AdaptiveVoiceSelector 实例时按实时延迟选择，否则按脚本序号轮换
+    preferred: 断点清单中该脚本上次使用的语音（自适应模式下沿用，保证续传命中）
+    """
+    voice = requested_voice(voice)
+    if voice is None:
+        if selector is not None:
+            return selector.choose(emotion, preferred)
+        return get_voice_for_emotion(emotion, script_index)
+    return voice
 
 def create_directories():
     dirs = ['outputs', 'logs', 'input']
@@ -114,153 +622,1598 @@ def get_emotion_params(emotion):
     """获取情绪对应的语音参数"""
     return EMOTION_PARAMS.get(emotion, EMOTION_PARAMS["Friendly"])
 
-def add_random_variation(params):
-    """添加 ±2% 随机扰动"""
-    import random
-    
-    # 对 rate 添加随机扰动
-    if params["rate"].startswith("+"):
-        base_rate = int(params["rate"][1:-1])
-        variation = random.randint(-2, 2)
-        new_rate = base_rate + variation
-        params["rate"] = f"+{new_rate}%" if new_rate >= 0 else f"{new_rate}%"
-    elif params["rate"].startswith("-"):
-        base_rate = int(params["rate"][:-1])
-        variation = random.randint(-2, 2)
-        new_rate = base_rate + variation
-        params["rate"] = f"{new_rate}%" if new_rate <= 0 else f"+{new_rate}%"
-    else:
-        # 处理没有符号的情况
-        base_rate = int(params["rate"][:-1])
-        variation = random.randint(-2, 2)
-        new_rate = base_rate + variation
-        params["rate"] = f"+{new_rate}%" if new_rate >= 0 else f"{new_rate}%"
-    
-    # 对 pitch 添加随机扰动 (Hz格式)
-    if params["pitch"].startswith("+"):
-        base_pitch = int(params["pitch"][1:-2])  # 去掉+和Hz
-        variation = random.randint(-2, 2)
-        new_pitch = base_pitch + variation
-        params["pitch"] = f"+{new_pitch}Hz" if new_pitch >= 0 else f"{new_pitch}Hz"
-    elif params["pitch"].startswith("-"):
-        base_pitch = int(params["pitch"][:-2])  # 去掉-和Hz
-        variation = random.randint(-2, 2)
-        new_pitch = base_pitch + variation
-        params["pitch"] = f"{new_pitch}Hz" if new_pitch >= 0 else f"{new_pitch}Hz"
-    
-    return params
-
-async def generate_single_audio(text, voice, emotion, output_path):
-    """生成单个音频文件"""
+def get_variation_seed(text, voice, emotion):
+    """根据合成输入生成稳定的扰动种子（同一脚本重复生成时参数一致，便于命中缓存）"""
+    return int(hashlib.md5(f"{text}|{voice}|{emotion}".encode("utf-8")).hexdigest()[:8], 16)
+
+def add_random_variation(params, rng=None):
+    """添加 ±2 随机扰动，返回新的 ProsodyParams（不修改参数表）
+
+    rng: 可选的 random.Random 实例，未提供时使用全局随机数
+    """
+    return params.with_variation(rng)
+
+def place_file(source_path, target_path):
+    """把已生成的音频放到目标路径（优先硬链接，跨设备时复制）"""
+    if os.path.abspath(source_path) == os.path.abspath(target_path):
+        return
+    if os.path.lexists(target_path):
+        os.remove(target_path)
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copyfile(source_path, target_path)
+
+class AudioCache:
+    """内容寻址音频缓存 - 以合成输入哈希为键存储 MP3，按总大小做 LRU 淘汰
+
+    多进程模式下各工作进程共用同一缓存目录，内存索引只是本进程的视图：
+    查不到的键会再查磁盘（其他进程写入的条目同样命中），索引中的文件被其他
+    进程淘汰时按未命中处理。本进程写入累计超过容量的 AUDIO_CACHE_SYNC_FRACTION
+    或估算占用超限时，在文件锁内重新扫描目录并按修改时间淘汰，整个目录的
+    占用不超过 max_bytes（另加各进程未同步的少量写入）。
+    """
+    
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> 文件大小，越靠后越新
+        self._total_bytes = 0
+        self._unsynced_bytes = 0  # 上次扫描目录后本进程写入的字节数
+        self._loaded = False
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(text, voice, rate, pitch, volume):
+        """计算合成输入的内容哈希"""
+        payload = json.dumps([text, voice, rate, pitch, volume], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+    
+    def _words_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.words.json")
+    
+    def _ensure_loaded(self):
+        """首次使用时扫描磁盘，按修改时间恢复 LRU 顺序"""
+        if self._loaded:
+            return
+        self._loaded = True
+        self._sync_and_evict()
+    
+    def _scan(self):
+        """按修改时间从旧到新重建索引与占用统计（以磁盘为准）"""
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, filenames in os.walk(self.cache_dir):
+                for filename in filenames:
+                    if not filename.endswith(".mp3"):
+                        continue
+                    path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, filename[:-4], stat.st_size))
+        entries.sort()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._unsynced_bytes = 0
+        for _, key, size in entries:
+            self._entries[key] = size
+            self._total_bytes += size
+    
+    def _sync_and_evict(self):
+        """在跨进程文件锁内重新统计目录占用并淘汰"""
+        lock_file = None
+        if fcntl is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                lock_file = open(os.path.join(self.cache_dir, ".lock"), "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            except OSError as e:
+                logger.warning(f"音频缓存加锁失败: {str(e)}")
+        try:
+            self._scan()
+            self._evict()
+        finally:
+            if lock_file is not None:
+                lock_file.close()  # 关闭文件即释放锁
+    
+    def _evict(self):
+        """超出容量时淘汰最久未使用的条目"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            for path in (self._path(key), self._words_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    
+    def fetch(self, key, output_path):
+        """命中时把缓存文件放到输出路径，返回是否命中"""
+        with self._lock:
+            self._ensure_loaded()
+            cached_path = self._path(key)
+            if key not in self._entries:
+                # 可能由其他进程写入
+                try:
+                    self._entries[key] = os.path.getsize(cached_path)
+                    self._total_bytes += self._entries[key]
+                except OSError:
+                    self.misses += 1
+                    return False
+            try:
+                place_file(cached_path, output_path)
+                os.utime(cached_path)  # 刷新修改时间，重启后仍保持 LRU 顺序
+            except OSError as e:
+                logger.warning(f"读取音频缓存失败: {key} - {str(e)}")
+                self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+    
+    def store(self, key, source_path):
+        """把新生成的音频写入缓存"""
+        with self._lock:
+            self._ensure_loaded()
+            cached_path = self._path(key)
+            if key in self._entries:
+                if os.path.exists(cached_path):
+                    return
+                self._total_bytes -= self._entries.pop(key)  # 已被其他进程淘汰，重新写入
+            try:
+                os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+                place_file(source_path, cached_path)
+                size = os.path.getsize(cached_path)
+            except OSError as e:
+                logger.warning(f"写入音频缓存失败: {key} - {str(e)}")
+                return
+            self._entries[key] = size
+            self._total_bytes += size
+            self._unsynced_bytes += size
+            self.stores += 1
+            if self._total_bytes > self.max_bytes or self._unsynced_bytes > self.max_bytes * AUDIO_CACHE_SYNC_FRACTION:
+                self._sync_and_evict()
+    
+    def has_words(self, key):
+        """缓存条目是否带有逐词时间（字幕旁路文件）"""
+        return os.path.exists(self._words_path(key))
+    
+    def fetch_words(self, key):
+        """读取缓存的逐词时间，不存在或损坏时返回 None"""
+        try:
+            with open(self._words_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def store_words(self, key, words):
+        """写入逐词时间旁路文件（随音频条目一起淘汰）"""
+        with self._lock:
+            if key not in self._entries:
+                return
+            path = self._words_path(key)
+            try:
+                with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                    json.dump(words, f, ensure_ascii=False)
+                os.replace(f"{path}.tmp", path)
+            except OSError as e:
+                logger.warning(f"写入字幕缓存失败: {key} - {str(e)}")
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": AUDIO_CACHE_ENABLED,
+                "directory": self.cache_dir,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions
+            }
+
+AUDIO_CACHE = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES)
+
+# 当前协程的调度优先级与租户（随 asyncio 任务上下文传递，默认按批量处理）
+SYNTH_PRIORITY = contextvars.ContextVar("synth_priority", default=PRIORITY_BATCH)
+SYNTH_TENANT = contextvars.ContextVar("synth_tenant", default=DEFAULT_TENANT)
+
+async def run_with_priority(priority, coro, tenant=None):
+    """以指定优先级（及租户）执行协程，其中创建的子任务继承这两个设置"""
+    SYNTH_PRIORITY.set(priority)
+    if tenant:
+        SYNTH_TENANT.set(tenant)
+    return await coro
+
+def tenant_weight(tenant):
+    return TENANT_WEIGHTS.get(tenant, DEFAULT_TENANT_WEIGHT)
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD 自适应并发限流器 - 根据上游延迟与错误动态调整在途合成数量
+
+    每次成功且延迟正常时加性增长（每轮约 +1），出现失败或延迟超过基线
+    CONCURRENCY_LATENCY_TOLERANCE 倍时乘性降低。延迟按每 100 字符归一化，
+    避免长短脚本混合时误判拥塞。只能在服务事件循环内调用。
+
+    名额按优先级分配：interactive 排队者总是先于 batch 被唤醒，且 batch 最多
+    使用 limit - reserved_slots 个名额，留给交互请求的余量不会被批量任务占满。
+    同一优先级内按租户做加权公平排队（stride 调度）：每次分配名额后租户的
+    pass 增加 1/权重，空出名额时优先唤醒 pass 最小的租户，提交脚本多的租户
+    不会因为排队者多而占满名额。
+    还可以为单个语音设置并发子上限：某个语音已满时，其排队者让位给其他语音。
+    """
+    
+    def __init__(self, initial, min_limit, max_limit,
+                 latency_tolerance=CONCURRENCY_LATENCY_TOLERANCE,
+                 decrease_factor=CONCURRENCY_DECREASE_FACTOR,
+                 reserved_slots=INTERACTIVE_RESERVED_SLOTS,
+                 voice_limit=VOICE_MAX_CONCURRENT, voice_limits=None):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.reserved_slots = max(0, reserved_slots)
+        self.default_voice_limit = max(0, voice_limit)
+        self.voice_limits = dict(VOICE_CONCURRENCY_LIMITS if voice_limits is None else voice_limits)
+        self.budget_share = 1  # 工作进程之间均分预算时的份数
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.in_flight = 0
+        self.in_flight_by_priority = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.in_flight_by_tenant = {}
+        self.in_flight_by_voice = {}
+        self.peak_in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.increases = 0
+        self.decreases = 0
+        # 优先级 -> {租户: [(future, 语音), ...]}
+        self._waiters = {priority: OrderedDict() for priority in PRIORITY_CLASSES}
+        self._tenant_pass = {}  # 租户已消耗的虚拟时间
+        self._virtual_time = 0.0
+        self._baseline_latency = None  # 归一化延迟基线（近似最小值）
+        self._latency_ewma = None
+        self._error_ewma = 0.0
+        self._completed_since_decrease = self.limit
+    
+    @property
+    def limit(self):
+        return int(self._limit)
+    
+    def capacity(self, priority):
+        """该优先级可使用的名额上限"""
+        if priority == PRIORITY_INTERACTIVE:
+            return self.limit
+        return max(1, self.limit - self.reserved_slots)
+    
+    def voice_limit(self, voice):
+        """该语音的并发子上限，0 表示不限"""
+        return self.voice_limits.get(voice, self.default_voice_limit)
+    
+    def _voice_available(self, voice):
+        limit = self.voice_limit(voice)
+        return not limit or self.in_flight_by_voice.get(voice, 0) < limit
+    
+    def split_budget(self, parts):
+        """把并发预算（总上限与语音子上限）均分为 parts 份
+
+        多进程模式下工作进程与前端进程各占一份（见 budget_parts()），
+        各进程的上限之和不超过配置的总预算。只能在未拆分的预算上调用一次。
+        """
+        parts = max(1, int(parts))
+        if parts == 1 or self.budget_share != 1:
+            return
+        self.budget_share = parts
+        self.max_limit = max(1, self.max_limit // parts)
+        self.min_limit = max(1, min(self.min_limit // parts, self.max_limit))
+        self._limit = float(min(max(self._limit / parts, self.min_limit), self.max_limit))
+        self.reserved_slots = min(self.reserved_slots, max(0, self.max_limit - 1))
+        if self.default_voice_limit:
+            self.default_voice_limit = max(1, self.default_voice_limit // parts)
+        self.voice_limits = {voice: max(1, limit // parts) for voice, limit in self.voice_limits.items()}
+    
+    def _can_start(self, priority, voice):
+        # 同级或更高优先级有人排队时不插队
+        for waiting_priority in PRIORITY_CLASSES:
+            if self._waiters[waiting_priority]:
+                return False
+            if waiting_priority == priority:
+                break
+        return self.in_flight < self.capacity(priority) and self._voice_available(voice)
+    
+    def _grant(self, priority, tenant, voice):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.in_flight_by_priority[priority] += 1
+        self.in_flight_by_tenant[tenant] = self.in_flight_by_tenant.get(tenant, 0) + 1
+        if voice:
+            self.in_flight_by_voice[voice] = self.in_flight_by_voice.get(voice, 0) + 1
+        # 空闲后重新活跃的租户从当前虚拟时间起算，不能攒下额度
+        start = max(self._tenant_pass.get(tenant, self._virtual_time), self._virtual_time)
+        self._virtual_time = start
+        self._tenant_pass[tenant] = start + 1.0 / tenant_weight(tenant)
+    
+    def _ungrant(self, priority, tenant, voice):
+        self.in_flight -= 1
+        self.in_flight_by_priority[priority] -= 1
+        if voice:
+            voice_remaining = self.in_flight_by_voice.get(voice, 1) - 1
+            if voice_remaining > 0:
+                self.in_flight_by_voice[voice] = voice_remaining
+            else:
+                self.in_flight_by_voice.pop(voice, None)
+        remaining = self.in_flight_by_tenant.get(tenant, 1) - 1
+        if remaining > 0:
+            self.in_flight_by_tenant[tenant] = remaining
+            return
+        self.in_flight_by_tenant.pop(tenant, None)
+        if not any(tenant in lane for lane in self._waiters.values()):
+            # 租户已空闲，清理调度状态（重新活跃时从当前虚拟时间起算）
+            self._tenant_pass.pop(tenant, None)
+    
+    async def acquire(self, priority=None, tenant=None, voice=None):
+        """获取一个上游合成名额（priority / tenant 默认取当前任务的上下文）"""
+        priority = priority or SYNTH_PRIORITY.get()
+        tenant = tenant or SYNTH_TENANT.get()
+        if self._can_start(priority, voice):
+            self._grant(priority, tenant, voice)
+            METRIC_LIMITER_WAIT.observe(0.0, priority=priority)
+            return
+        
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (waiter, voice)
+        self._waiters[priority].setdefault(tenant, deque()).append(entry)
+        # 排在前面的可能都在等已满的语音，此时可以直接分配
+        self._wake_waiters()
+        wait_started = time.monotonic()
+        try:
+            await waiter
+            METRIC_LIMITER_WAIT.observe(time.monotonic() - wait_started, priority=priority)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已分配但调用方被取消，归还名额
+                self._ungrant(priority, tenant, voice)
+                self._wake_waiters()
+            else:
+                tenant_waiters = self._waiters[priority].get(tenant)
+                if tenant_waiters is not None:
+                    try:
+                        tenant_waiters.remove(entry)
+                    except ValueError:
+                        pass
+                    if not tenant_waiters:
+                        del self._waiters[priority][tenant]
+            raise
+    
+    def release(self, latency=None, success=True, text_length=None, priority=None, tenant=None, voice=None):
+        """归还名额并根据本次结果调整并发上限（success 为 None 表示被取消，不计入结果）"""
+        self._ungrant(priority or SYNTH_PRIORITY.get(), tenant or SYNTH_TENANT.get(), voice)
+        if success is not None:
+            self._observe(latency, success, text_length)
+        self._wake_waiters()
+    
+    def has_capacity(self, voice=None, priority=None):
+        """当前能否不排队地立即拿到名额"""
+        return self._can_start(priority or SYNTH_PRIORITY.get(), voice)
+    
+    def _next_waiter(self, lane):
+        """按 pass 从小到大挑选租户，取其第一个语音未满的排队者"""
+        for tenant in sorted(lane, key=lambda tenant: self._tenant_pass.get(tenant, self._virtual_time)):
+            waiters = lane[tenant]
+            for position, (waiter, voice) in enumerate(waiters):
+                if waiter.done() or self._voice_available(voice):
+                    del waiters[position]
+                    if not waiters:
+                        del lane[tenant]
+                    return tenant, waiter, voice
+        return None
+    
+    def _wake_waiters(self):
+        # 按优先级从高到低唤醒；高优先级因总名额不足而排队时不唤醒低优先级
+        for priority in PRIORITY_CLASSES:
+            lane = self._waiters[priority]
+            while lane and self.in_flight < self.capacity(priority):
+                picked = self._next_waiter(lane)
+                if picked is None:
+                    # 剩余排队者都在等已满的语音
+                    break
+                tenant, waiter, voice = picked
+                if waiter.done():
+                    continue
+                self._grant(priority, tenant, voice)
+                waiter.set_result(None)
+            if lane and self.in_flight >= self.capacity(priority):
+                return
+    
+    def waiting(self, priority=None):
+        """排队数量（priority 为空时返回总数）"""
+        lanes = [self._waiters[priority]] if priority is not None else self._waiters.values()
+        return sum(len(waiters) for lane in lanes for waiters in lane.values())
+    
+    def voice_stats(self):
+        """各语音的在途数与子上限"""
+        voices = {voice: {"in_flight": 0, "limit": limit} for voice, limit in self.voice_limits.items()}
+        for voice, count in self.in_flight_by_voice.items():
+            voices.setdefault(voice, {"limit": self.voice_limit(voice)})["in_flight"] = count
+        return voices
+    
+    def tenant_stats(self):
+        """各租户的在途数、排队数与权重"""
+        tenants = {}
+        for tenant, count in self.in_flight_by_tenant.items():
+            tenants.setdefault(tenant, {"in_flight": 0, "waiting": 0})["in_flight"] = count
+        for lane in self._waiters.values():
+            for tenant, waiters in lane.items():
+                tenants.setdefault(tenant, {"in_flight": 0, "waiting": 0})["waiting"] += len(waiters)
+        for tenant, info in tenants.items():
+            info["weight"] = tenant_weight(tenant)
+        return tenants
+    
+    def _observe(self, latency, success, text_length):
+        self._completed_since_decrease += 1
+        self._error_ewma = self._error_ewma * 0.9 + (0.0 if success else 0.1)
+        
+        if not success:
+            self.failures += 1
+            self._decrease()
+            return
+        
+        self.successes += 1
+        if latency is None:
+            return
+        
+        normalized = latency / max(text_length or 100, 1) * 100
+        self._latency_ewma = normalized if self._latency_ewma is None else self._latency_ewma * 0.8 + normalized * 0.2
+        if self._baseline_latency is None or normalized < self._baseline_latency:
+            self._baseline_latency = normalized
+        else:
+            # 基线缓慢上浮，适应上游整体变慢
+            self._baseline_latency += (normalized - self._baseline_latency) * 0.01
+        
+        if normalized > self._baseline_latency * self.latency_tolerance:
+            self._decrease()
+        elif self._limit < self.max_limit:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self.increases += 1
+    
+    def _decrease(self):
+        # 每一轮（约 limit 个完成）最多降低一次，避免同一波拥塞连续打折
+        if self._completed_since_decrease < self.limit:
+            return
+        self._completed_since_decrease = 0
+        new_limit = max(self.min_limit, self._limit * self.decrease_factor)
+        if new_limit < self._limit:
+            self._limit = new_limit
+            self.decreases += 1
+            logger.warning(f"上游拥塞，并发上限降低到 {self.limit}")
+    
+    def stats(self):
+        return {
+            "current_limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "utilization": round(self.in_flight / self.limit, 4) if self.limit else 0.0,
+            "budget_share": self.budget_share,
+            "waiting": self.waiting(),
+            "in_flight_by_priority": dict(self.in_flight_by_priority),
+            "waiting_by_priority": {priority: self.waiting(priority) for priority in PRIORITY_CLASSES},
+            "reserved_interactive_slots": self.reserved_slots,
+            "batch_capacity": self.capacity(PRIORITY_BATCH),
+            "tenants": self.tenant_stats(),
+            "default_voice_limit": self.default_voice_limit,
+            "voices": self.voice_stats(),
+            "successes": self.successes,
+            "failures": self.failures,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "error_rate": round(self._error_ewma, 4),
+            "latency_per_100_chars": round(self._latency_ewma, 4) if self._latency_ewma is not None else None,
+            "baseline_latency_per_100_chars": round(self._baseline_latency, 4) if self._baseline_latency is not None else None
+        }
+
+# 服务级上游并发限流器（所有批次共享）
+UPSTREAM_LIMITER = AdaptiveConcurrencyLimiter(INITIAL_CONCURRENT, MIN_CONCURRENT, MAX_CONCURRENT)
+METRICS.gauge("tts_in_flight", "正在进行的上游合成请求数", ("priority",),
+              callback=lambda: {(priority,): count for priority, count in UPSTREAM_LIMITER.in_flight_by_priority.items()})
+METRICS.gauge("tts_limiter_waiting", "排队等待并发名额的请求数", ("priority",),
+              callback=lambda: {(priority,): UPSTREAM_LIMITER.waiting(priority) for priority in PRIORITY_CLASSES})
+METRICS.gauge("tts_concurrency_limit", "当前自适应并发上限", callback=lambda: UPSTREAM_LIMITER.limit)
+METRICS.gauge("tts_concurrency_utilization", "在途请求数占并发上限的比例",
+              callback=lambda: UPSTREAM_LIMITER.in_flight / UPSTREAM_LIMITER.limit if UPSTREAM_LIMITER.limit else 0.0)
+METRICS.counter("tts_connector_connections_total", "共享连接器获取连接次数（new 新建 / reused 复用）", ("kind",),
+                callback=lambda: {("new",): connector_stats()["new_connections"], ("reused",): connector_stats()["reused_connections"]})
+METRICS.counter("tts_connector_dns_total", "共享连接器主机名解析次数（lookup 实际查询 / cache_hit 命中缓存）", ("kind",),
+                callback=lambda: {("lookup",): connector_stats()["dns_resolves"] - connector_stats()["dns_cache_hits"], ("cache_hit",): connector_stats()["dns_cache_hits"]})
+
+class CircuitBreaker:
+    """上游熔断器 - 连续失败达到阈值后暂停所有合成，冷却后放行一个试探请求"""
+    
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"  # closed / open / half_open
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self._open_until = 0.0
+        self._probe_in_flight = False
+    
+    async def wait_until_available(self):
+        """熔断打开时等待恢复，返回等待的秒数"""
+        started = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if self.state == "open":
+                if now < self._open_until:
+                    await asyncio.sleep(self._open_until - now)
+                    continue
+                self.state = "half_open"
+                self._probe_in_flight = False
+                logger.info("熔断冷却结束，放行试探请求")
+            if self.state == "half_open":
+                if self._probe_in_flight:
+                    await asyncio.sleep(0.2)
+                    continue
+                self._probe_in_flight = True
+            return time.monotonic() - started
+    
+    def record_success(self):
+        if self.state != "closed":
+            logger.info("上游恢复，熔断器关闭")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                logger.error(f"上游连续失败 {self.consecutive_failures} 次，熔断 {self.reset_timeout} 秒")
+            self.state = "open"
+            self._open_until = time.monotonic() + self.reset_timeout
+    
+    def release_probe(self):
+        """试探请求被取消时释放试探名额"""
+        self._probe_in_flight = False
+    
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_seconds": self.reset_timeout,
+            "times_opened": self.times_opened,
+            "retry_in_seconds": round(max(0.0, self._open_until - time.monotonic()), 2) if self.state == "open" else 0.0
+        }
+
+UPSTREAM_BREAKER = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+METRICS.gauge("tts_circuit_open", "熔断器是否处于打开状态（1 为打开）", callback=lambda: int(UPSTREAM_BREAKER.state == "open"))
+
+class SynthesisError(Exception):
+    """多次重试后仍然失败的合成错误，携带尝试次数与累计等待时间"""
+    
+    def __init__(self, message, attempts, wait_seconds):
+        super().__init__(message)
+        self.attempts = attempts
+        self.wait_seconds = wait_seconds
+
+def get_backoff_delay(attempt):
+    """指数退避 + 全抖动"""
+    return random.uniform(0, min(SYNTH_BACKOFF_MAX, SYNTH_BACKOFF_BASE * (2 ** (attempt - 1))))
+
+def is_retryable_error(error):
+    """参数类错误重试无意义，其余（网络、超时、服务端）均可重试"""
+    return not isinstance(error, (ValueError, TypeError))
+
+async def write_audio_stream(communicate, path, timings, words=None):
+    """把 edge-tts 音频流写入文件，记录首字节与末字节时间
+
+    words 不为 None 时同时收集 WordBoundary 事件（秒为单位的 offset / duration）。
+    """
+    with open(path, "wb") as audio_file:
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                if "first_byte" not in timings:
+                    timings["first_byte"] = time.monotonic()
+                audio_file.write(chunk["data"])
+                timings["last_byte"] = time.monotonic()
+            elif chunk["type"] == "WordBoundary" and words is not None:
+                words.append({
+                    "offset": chunk["offset"] / 1e7,
+                    "duration": chunk["duration"] / 1e7,
+                    "text": chunk["text"]
+                })
+
+async def synthesize_once(text, voice, params, output_path, timings=None, words=None, timeout=SYNTH_ATTEMPT_TIMEOUT, started=None):
+    """调用一次 edge-tts 把音频写入 output_path
+
+    先写入 .part 临时文件，完整后再原子替换；timings 记录本次尝试各阶段的
+    time.monotonic() 时间点（queued / synth_start / first_byte / last_byte / file_written）。
+    words 不为 None 时请求逐词边界事件，成功后填入本次尝试的逐词时间。
+    timeout 从拿到并发名额开始计算，不含排队时间；started（asyncio.Event）在拿到名额时置位。
+    """
+    # 构建 EdgeTTS 命令参数
+    extra_options = {"boundary": "WordBoundary"} if words is not None else {}
+    communicate = edge_tts.Communicate(
+        text=text,
+        voice=voice,
+        rate=params["rate"],
+        pitch=params["pitch"],
+        volume=params["volume"],
+        connector=get_shared_connector(),
+        **extra_options
+    )
+    part_path = f"{output_path}.part"
+    attempt_timings = {"queued": time.monotonic()}
+    attempt_words = [] if words is not None else None
+    
+    # 生成音频文件（占用一个上游并发名额）
+    await UPSTREAM_LIMITER.acquire(voice=voice)
+    synth_started = time.monotonic()
+    attempt_timings["synth_start"] = synth_started
+    if started is not None:
+        started.set()
+    synth_ok = False
+    try:
+        await asyncio.wait_for(write_audio_stream(communicate, part_path, attempt_timings, attempt_words), timeout)
+        
+        # 检查文件是否真的生成了
+        if not os.path.exists(part_path) or os.path.getsize(part_path) == 0:
+            raise RuntimeError("文件未生成")
+        os.replace(part_path, output_path)
+        attempt_timings["file_written"] = time.monotonic()
+        if words is not None:
+            words[:] = attempt_words
+        synth_ok = True
+    except asyncio.CancelledError:
+        # 被取消（对冲落败、任务取消）不是上游失败，不影响并发上限
+        synth_ok = None
+        raise
+    finally:
+        UPSTREAM_LIMITER.release(time.monotonic() - synth_started, synth_ok, len(text), voice=voice)
+        if synth_ok is not None:
+            VOICE_HEALTH.observe(voice, time.monotonic() - synth_started, len(text), synth_ok)
+        if not synth_ok and os.path.lexists(part_path):
+            os.remove(part_path)
+        if timings is not None:
+            # 只保留最后一次尝试的时间点
+            timings.clear()
+            timings.update(attempt_timings)
+
+class HedgeController:
+    """对冲请求控制 - 按语音统计单次合成延迟，决定何时以及能否发起对冲
+
+    延迟按每 100 字符归一化（与限流器一致），对冲等待时间为该语音近期
+    HEDGE_PERCENTILE 分位延迟乘以脚本长度。对冲请求总数不超过主请求数的
+    max_ratio，且只在限流器有空闲名额、没有其他请求排队时发起，不挤占正常任务。
+    """
+    
+    def __init__(self, max_ratio=HEDGE_MAX_RATIO, min_samples=HEDGE_MIN_SAMPLES, window=HEDGE_WINDOW):
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.primaries = 0
+        self.hedges = 0
+        self.wins = 0
+        self.skipped = 0  # 达到 p95 但因额外负载上限或无空闲名额未对冲
+        self._samples = {}  # 语音 -> 最近的归一化延迟
+    
+    def observe(self, voice, seconds, text_length):
+        samples = self._samples.get(voice)
+        if samples is None:
+            samples = self._samples[voice] = deque(maxlen=self.window)
+        samples.append(seconds / max(text_length, 1) * 100)
+    
+    def hedge_delay(self, voice, text_length):
+        """该脚本的对冲等待时间（秒），样本不足时返回 None"""
+        samples = self._samples.get(voice)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        p95 = percentile(sorted(samples), HEDGE_PERCENTILE)
+        return max(HEDGE_MIN_DELAY, p95 * max(text_length, 1) / 100)
+    
+    def try_hedge(self, voice):
+        """额外负载未超上限且有空闲名额时登记一次对冲"""
+        if self.hedges + 1 > self.max_ratio * self.primaries or not UPSTREAM_LIMITER.has_capacity(voice):
+            self.skipped += 1
+            return False
+        self.hedges += 1
+        METRIC_HEDGES_TOTAL.inc(voice=voice)
+        return True
+    
+    def record_win(self, voice):
+        self.wins += 1
+        METRIC_HEDGE_WINS_TOTAL.inc(voice=voice)
+    
+    def stats(self):
+        return {
+            "enabled": HEDGING_ENABLED,
+            "max_ratio": self.max_ratio,
+            "primaries": self.primaries,
+            "hedges": self.hedges,
+            "wins": self.wins,
+            "skipped": self.skipped,
+            "extra_load": round(self.hedges / self.primaries, 4) if self.primaries else 0.0,
+            "voices_tracked": len(self._samples)
+        }
+
+METRIC_HEDGES_TOTAL = METRICS.counter("tts_hedge_requests_total", "发起的对冲请求数", ("voice",))
+METRIC_HEDGE_WINS_TOTAL = METRICS.counter("tts_hedge_wins_total", "对冲请求先于原请求完成的次数", ("voice",))
+HEDGE_CONTROLLER = HedgeController()
+
+async def synthesize_hedged(text, voice, params, output_path, timings=None, words=None, timeout=SYNTH_ATTEMPT_TIMEOUT):
+    """一次合成尝试；原请求拿到名额后超过该语音 p95 延迟仍未完成时发起对冲请求
+
+    对冲请求写入 {output_path}.hedge，先成功者的音频、时间点与逐词时间作为本次
+    结果，另一个立即取消（归还名额）。两个都失败时抛出原请求的异常。
+    """
+    if not HEDGING_ENABLED:
+        return await synthesize_once(text, voice, params, output_path, timings, words, timeout)
+    
+    HEDGE_CONTROLLER.primaries += 1
+    delay = HEDGE_CONTROLLER.hedge_delay(voice, len(text))
+    hedge_path = f"{output_path}.hedge"
+    attempts = {}  # 任务 -> (输出路径, 时间点, 逐词时间)
+    
+    def launch(path, started=None):
+        attempt_timings = {}
+        attempt_words = [] if words is not None else None
+        task = asyncio.ensure_future(synthesize_once(text, voice, params, path, attempt_timings, attempt_words, timeout, started))
+        attempts[task] = (path, attempt_timings, attempt_words)
+        return task
+    
+    started = asyncio.Event()
+    primary = launch(output_path, started)
+    hedge = None
+    try:
+        if delay is not None:
+            # 从原请求拿到名额开始计时
+            started_waiter = asyncio.ensure_future(started.wait())
+            try:
+                await asyncio.wait({primary, started_waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                started_waiter.cancel()
+            if not primary.done():
+                await asyncio.wait({primary}, timeout=delay)
+            if not primary.done() and HEDGE_CONTROLLER.try_hedge(voice):
+                logger.info(f"合成超过 p95 延迟 {delay:.2f} 秒，发起对冲请求: {text[:30]}...")
+                hedge = launch(hedge_path)
+        
+        # 先成功者胜出；一个失败时继续等另一个
+        winner = None
+        pending = {task for task in (primary, hedge) if task is not None}
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in (primary, hedge):
+                if task in done and task.exception() is None:
+                    winner = task
+                    break
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    except BaseException:
+        for task in (primary, hedge):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*[task for task in (primary, hedge) if task is not None], return_exceptions=True)
+        if os.path.lexists(hedge_path):
+            os.remove(hedge_path)
+        raise
+    
+    if winner is None:
+        if timings is not None:
+            timings.clear()
+            timings.update(attempts[primary][1])
+        raise primary.exception()
+    
+    path, attempt_timings, attempt_words = attempts[winner]
+    if winner is hedge:
+        os.replace(hedge_path, output_path)
+        HEDGE_CONTROLLER.record_win(voice)
+    elif os.path.lexists(hedge_path):
+        os.remove(hedge_path)
+    HEDGE_CONTROLLER.observe(voice, attempt_timings["file_written"] - attempt_timings["synth_start"], len(text))
+    if timings is not None:
+        timings.clear()
+        timings.update(attempt_timings)
+    if words is not None:
+        words[:] = attempt_words
+
+async def synthesize_with_retry(text, voice, params, output_path, timings=None, words=None):
+    """带重试、退避与熔断的上游合成，返回 (尝试次数, 累计等待秒数)
+
+    SYNTH_DEADLINE 从首次拿到并发名额起计时，覆盖全部重试与退避；
+    剩余时间不够再退避一次时直接失败，不再占用名额。
+    """
+    attempts = 0
+    wait_seconds = 0.0
+    deadline = None
+    timings = {} if timings is None else timings
+    while True:
+        wait_seconds += await UPSTREAM_BREAKER.wait_until_available()
+        attempts += 1
+        attempt_timeout = SYNTH_ATTEMPT_TIMEOUT
+        if deadline is not None:
+            attempt_timeout = min(attempt_timeout, max(deadline - time.monotonic(), 0.001))
+        try:
+            await synthesize_hedged(text, voice, params, output_path, timings, words, attempt_timeout)
+        except asyncio.CancelledError:
+            UPSTREAM_BREAKER.release_probe()
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                e = TimeoutError(f"单次合成超过 {attempt_timeout:.1f} 秒")
+            if not is_retryable_error(e):
+                UPSTREAM_BREAKER.release_probe()
+                raise SynthesisError(str(e), attempts, wait_seconds) from e
+            UPSTREAM_BREAKER.record_failure()
+            if attempts >= SYNTH_MAX_ATTEMPTS:
+                raise SynthesisError(str(e), attempts, wait_seconds) from e
+            
+            delay = get_backoff_delay(attempts)
+            if deadline is None and SYNTH_DEADLINE > 0 and "synth_start" in timings:
+                deadline = timings["synth_start"] + SYNTH_DEADLINE
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise SynthesisError(f"超过单条合成期限 {SYNTH_DEADLINE:g} 秒: {str(e)}", attempts, wait_seconds) from e
+            METRIC_RETRIES_TOTAL.inc(mode="batch")
+            logger.warning(f"合成失败（第 {attempts} 次）: {type(e).__name__}: {str(e)}，{delay:.2f} 秒后重试")
+            await asyncio.sleep(delay)
+            wait_seconds += delay
+            continue
+        
+        UPSTREAM_BREAKER.record_success()
+        return attempts, wait_seconds
+
+async def stream_audio_chunks(text, voice, params, chunks, tenant=None):
+    """流式合成：把 edge-tts 音频块放入线程安全队列
+
+    队列中 None 表示结束，异常对象表示失败。首个音频块发出之前的失败会按
+    重试策略重试；已经开始输出后无法重试，直接把异常交给调用方。
+    """
+    SYNTH_PRIORITY.set(PRIORITY_INTERACTIVE)
+    if tenant:
+        SYNTH_TENANT.set(tenant)
+    attempts = 0
+    sent_audio = False
+    try:
+        while True:
+            await UPSTREAM_BREAKER.wait_until_available()
+            attempts += 1
+            communicate = edge_tts.Communicate(
+                text=text,
+                voice=voice,
+                rate=params["rate"],
+                pitch=params["pitch"],
+                volume=params["volume"],
+                connector=get_shared_connector()
+            )
+            
+            async def consume():
+                nonlocal sent_audio
+                async for chunk in communicate.stream():
+                    if chunk["type"] == "audio":
+                        chunks.put_nowait(chunk["data"])
+                        METRIC_AUDIO_BYTES.inc(len(chunk["data"]), voice=voice, source="stream")
+                        sent_audio = True
+            
+            retry_delay = None
+            await UPSTREAM_LIMITER.acquire(voice=voice)
+            stream_started = time.monotonic()
+            stream_ok = False
+            try:
+                await asyncio.wait_for(consume(), SYNTH_ATTEMPT_TIMEOUT)
+                stream_ok = True
+            except asyncio.CancelledError:
+                UPSTREAM_BREAKER.release_probe()
+                stream_ok = None  # 客户端断开不是上游失败
+                raise
+            except Exception as e:
+                UPSTREAM_BREAKER.record_failure()
+                if sent_audio or attempts >= SYNTH_MAX_ATTEMPTS or not is_retryable_error(e):
+                    raise
+                retry_delay = get_backoff_delay(attempts)
+                METRIC_RETRIES_TOTAL.inc(mode="stream")
+                logger.warning(f"流式合成失败（第 {attempts} 次）: {type(e).__name__}: {str(e)}，{retry_delay:.2f} 秒后重试")
+            finally:
+                UPSTREAM_LIMITER.release(time.monotonic() - stream_started, stream_ok, len(text), voice=voice)
+                if stream_ok is not None:
+                    VOICE_HEALTH.observe(voice, time.monotonic() - stream_started, len(text), stream_ok)
+            
+            if retry_delay is None:
+                UPSTREAM_BREAKER.record_success()
+                break
+            await asyncio.sleep(retry_delay)
+        
+        chunks.put_nowait(None)
+    except asyncio.CancelledError:
+        chunks.put_nowait(None)
+        raise
+    except Exception as e:
+        logger.error(f"流式合成失败: {text[:50]}... - {type(e).__name__}: {str(e)}")
+        chunks.put_nowait(e)
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。！？])\s+")
+
+def split_into_chunks(text, target_words=CHUNK_TARGET_WORDS):
+    """在句子边界把长文本切成若干段，每段约 target_words 个词
+
+    单个句子不会被拆开；过短的尾段并入前一段，避免出现只有几个词的片段。
+    """
+    chunks = []
+    current = []
+    current_words = 0
+    for sentence in SENTENCE_BOUNDARY.split(text.strip()):
+        if not sentence:
+            continue
+        current.append(sentence)
+        current_words += len(sentence.split())
+        if current_words >= target_words:
+            chunks.append(" ".join(current))
+            current = []
+            current_words = 0
+    if current:
+        if chunks and current_words < target_words // 2:
+            chunks[-1] = chunks[-1] + " " + " ".join(current)
+        else:
+            chunks.append(" ".join(current))
+    return chunks
+
+def strip_id3_tags(data):
+    """去掉 MP3 数据首尾的 ID3v2 / ID3v1 标签，只保留音频帧"""
+    if data[:3] == b"ID3" and len(data) >= 10:
+        # ID3v2 标签长度为 4 个 7 位同步安全整数
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        header_size = 10 + size + (10 if data[5] & 0x10 else 0)
+        data = data[header_size:]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+def join_mp3_files(part_paths, output_path):
+    """按顺序拼接 MP3 帧（不解码），先写临时文件再原子替换，返回各段音频字节数"""
+    temp_path = f"{output_path}.part"
+    sizes = []
+    with open(temp_path, "wb") as output_file:
+        for path in part_paths:
+            with open(path, "rb") as part_file:
+                data = strip_id3_tags(part_file.read())
+            output_file.write(data)
+            sizes.append(len(data))
+    os.replace(temp_path, output_path)
+    return sizes
+
+async def synthesize_chunked(chunks, voice, params, output_path, timings, words=None):
+    """分段并发合成后拼接，每段独立重试；返回 (总尝试次数, 最长等待秒数)
+
+    words 不为 None 时按各段音频时长平移逐词时间，合并为整段的逐词时间。
+    """
+    part_paths = [f"{output_path}.chunk{i:02d}" for i in range(len(chunks))]
+    chunk_timings = [{} for _ in chunks]
+    chunk_words = [[] if words is not None else None for _ in chunks]
+    tasks = [
+        asyncio.ensure_future(synthesize_with_retry(chunk, voice, params, path, chunk_timing, chunk_word_list))
+        for chunk, path, chunk_timing, chunk_word_list in zip(chunks, part_paths, chunk_timings, chunk_words)
+    ]
+    try:
+        outcomes = await asyncio.gather(*tasks)
+        sizes = join_mp3_files(part_paths, output_path)
+    except BaseException:
+        # 任一分段最终失败时取消其余分段
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        for path in part_paths:
+            if os.path.lexists(path):
+                os.remove(path)
+    
+    if words is not None:
+        # 恒定码率下由字节数推算每段时长
+        elapsed = 0.0
+        for chunk_word_list, size in zip(chunk_words, sizes):
+            words.extend(dict(word, offset=round(word["offset"] + elapsed, 4)) for word in chunk_word_list)
+            elapsed += size / EDGE_MP3_BYTES_PER_SECOND
+    
+    # 合并计时：开始类阶段取最早，末字节取最晚，文件落盘以拼接完成为准
+    for stage in ("queued", "synth_start", "first_byte"):
+        values = [t[stage] for t in chunk_timings if stage in t]
+        if values:
+            timings[stage] = min(values)
+    last_bytes = [t["last_byte"] for t in chunk_timings if "last_byte" in t]
+    if last_bytes:
+        timings["last_byte"] = max(last_bytes)
+    timings["file_written"] = time.monotonic()
+    return sum(attempts for attempts, _ in outcomes), max(wait for _, wait in outcomes)
+
+def resolve_tenant(data):
+    """请求所属租户：X-Tenant 请求头 > tenant 字段 > 产品名"""
+    tenant = request.headers.get("X-Tenant") or data.get("tenant") or data.get("product_name")
+    tenant = str(tenant or "").strip()[:64]
+    return tenant or DEFAULT_TENANT
+
+def parse_priority_option(value, script_count, default=PRIORITY_BATCH):
+    """解析请求中的优先级；未指定时少量脚本按交互处理，非法值抛出 ValueError"""
+    if value is None:
+        return PRIORITY_INTERACTIVE if script_count <= INTERACTIVE_MAX_SCRIPTS else default
+    if value not in PRIORITY_CLASSES:
+        raise ValueError(f"不支持的优先级: {value}（可选 {', '.join(PRIORITY_CLASSES)}）")
+    return value
+
+def parse_deadline_option(value):
+    """解析请求中的 deadline_seconds；未提供时返回 None，非法值抛出 ValueError"""
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"deadline_seconds 必须是数字: {value}")
+    if seconds < 0:
+        raise ValueError("deadline_seconds 不能为负数")
+    return seconds
+
+def parse_chunked_option(value):
+    """解析请求中的分段合成开关，返回 True / False / None（None 表示使用服务默认配置），非法值抛出 ValueError"""
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "on"):
+        return True
+    if text in ("0", "false", "no", "off"):
+        return False
+    if text in ("", "none", "default"):
+        return None
+    raise ValueError(f"无效的 chunked 取值: {value}（可选 true / false）")
+
+def parse_subtitle_option(value):
+    """解析请求中的字幕选项，返回 "srt" / "vtt" / None，非法值抛出 ValueError"""
+    if value is None:
+        return SUBTITLE_DEFAULT_FORMAT
+    if value is True:
+        return "srt"
+    if value is False or str(value).lower() in ("", "0", "false", "none"):
+        return None
+    if str(value).lower() not in SUBTITLE_FORMATS:
+        raise ValueError(f"不支持的字幕格式: {value}（可选 {', '.join(SUBTITLE_FORMATS)}）")
+    return str(value).lower()
+
+def get_subtitle_path(audio_path, subtitle_format):
+    return f"{os.path.splitext(audio_path)[0]}.{subtitle_format}"
+
+def group_subtitle_cues(words):
+    """把逐词时间合并为字幕条目 (开始秒, 结束秒, 文本)"""
+    cues = []
+    current = []
+    for word in words:
+        if current and (len(current) >= SUBTITLE_MAX_WORDS
+                        or word["offset"] + word["duration"] - current[0]["offset"] > SUBTITLE_MAX_SECONDS):
+            cues.append(current)
+            current = []
+        current.append(word)
+    if current:
+        cues.append(current)
+    return [
+        (cue[0]["offset"], cue[-1]["offset"] + cue[-1]["duration"], " ".join(word["text"] for word in cue))
+        for cue in cues
+    ]
+
+def format_subtitle_timestamp(seconds, separator):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+def write_subtitle_file(words, path, subtitle_format):
+    """把逐词时间写成 SRT / VTT 字幕文件（先写临时文件再替换）"""
+    separator = "," if subtitle_format == "srt" else "."
+    lines = ["WEBVTT", ""] if subtitle_format == "vtt" else []
+    for number, (start, end, text) in enumerate(group_subtitle_cues(words), 1):
+        if subtitle_format == "srt":
+            lines.append(str(number))
+        lines.append(f"{format_subtitle_timestamp(start, separator)} --> {format_subtitle_timestamp(end, separator)}")
+        lines.append(text)
+        lines.append("")
+    temp_path = f"{path}.part"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    os.replace(temp_path, path)
+
+# 单条脚本的计时阶段（相对脚本开始处理时刻的秒数）
+TIMING_STAGES = ("queued", "synth_start", "first_byte", "last_byte", "file_written")
+
+# 单条脚本的阶段耗时：名称 -> (起点, 终点)，起点 None 表示脚本开始处理时刻
+STAGE_DURATIONS = {
+    "prepare": (None, "queued"),  # 缓存查询、之前失败的尝试与退避等待
+    "queue_wait": ("queued", "synth_start"),  # 等待上游并发名额
+    "ttfb": ("synth_start", "first_byte"),  # 上游首字节延迟
+    "transfer": ("first_byte", "last_byte"),  # 音频流传输
+    "write": ("last_byte", "file_written"),  # 写盘（含分段合并）
+    "total": (None, "file_written")
+}
+
+def relative_timings(timings, started):
+    """把 time.monotonic() 时间点换算为相对开始时刻的秒数"""
+    return {stage: round(timings[stage] - started, 4) for stage in TIMING_STAGES if stage in timings}
+
+def stage_durations(relative):
+    """由相对时间点计算各阶段耗时（秒），缺少端点的阶段不返回"""
+    durations = {}
+    for name, (begin, end) in STAGE_DURATIONS.items():
+        if end in relative and (begin is None or begin in relative):
+            durations[name] = round(relative[end] - (relative[begin] if begin else 0.0), 4)
+    return durations
+
+def percentile(sorted_values, fraction):
+    """最近秩百分位数（输入需已排序）"""
+    rank = max(1, int(-(-len(sorted_values) * fraction // 1)))
+    return sorted_values[rank - 1]
+
+def summarize_stage_timings(results):
+    """汇总批次内各阶段耗时（每条脚本的 durations）的 p50 / p95 / max，重复脚本（duplicate_of）不计入"""
+    summary = {}
+    for stage in STAGE_DURATIONS:
+        values = sorted(
+            r["durations"][stage] for r in results
+            if isinstance(r, dict) and not r.get("duplicate_of") and stage in r.get("durations", {})
+        )
+        if values:
+            summary[stage] = {
+                "count": len(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "max": values[-1]
+            }
+    return summary
+
+async def generate_single_audio(text, voice, emotion, output_path, chunked=None, subtitles=None):
+    """生成单个音频文件
+
+    chunked: 是否对长脚本分段并行合成（None 时使用 TTS_CHUNKED_SYNTHESIS 默认值）
+    subtitles: "srt" / "vtt" 时在同一次合成中收集逐词时间，并在音频旁写出字幕文件
+
+    返回结果的 timings 字段记录各阶段相对本函数开始时刻的秒数：
+    queued 最后一次尝试开始排队，synth_start 拿到并发名额并发起请求，
+    first_byte / last_byte 收到首个 / 最后一个音频块，file_written 文件落盘；
+    durations 字段为由此算出的各阶段耗时（见 STAGE_DURATIONS）。
+    """
+    started = time.monotonic()
+    timings = {}
     try:
         logger.info(f"开始生成音频: {text[:30]}...")
         logger.info(f"输出路径: {output_path}")
         
-        # 获取情绪参数
-        params = get_emotion_params(emotion)
-        logger.info(f"基础参数: {params}")
-        params = add_random_variation(params)
+        # 获取情绪参数（复制一份，避免修改共享的参数表）
+        base_params = get_emotion_params(emotion)
+        logger.info(f"基础参数: {base_params}")
+        params = add_random_variation(base_params, random.Random(get_variation_seed(text, voice, emotion))).to_edge_tts()
         logger.info(f"最终参数: {params}")
         
-        # 构建 EdgeTTS 命令参数
-        communicate = edge_tts.Communicate(
-            text=text,
-            voice=voice,
-            rate=params["rate"],
-            pitch=params["pitch"],
-            volume=params["volume"]
-        )
+        subtitle_path = get_subtitle_path(output_path, subtitles) if subtitles else None
         
-        logger.info(f"EdgeTTS对象创建成功，开始保存到: {output_path}")
+        # 查询音频缓存（需要字幕时，缓存条目必须带有逐词时间）
+        cache_key = None
+        if AUDIO_CACHE_ENABLED:
+            cache_key = AudioCache.make_key(text, voice, params["rate"], params["pitch"], params["volume"])
+            cached_words = AUDIO_CACHE.fetch_words(cache_key) if subtitles else None
+            if (not subtitles or cached_words is not None) and AUDIO_CACHE.fetch(cache_key, output_path):
+                logger.info(f"命中音频缓存: {output_path}")
+                METRIC_SYNTH_TOTAL.inc(voice=voice, emotion=emotion, outcome="cache_hit")
+                METRIC_AUDIO_BYTES.inc(os.path.getsize(output_path), voice=voice, source="cache")
+                result = {
+                    "success": True,
+                    "file_path": output_path,
+                    "params": params,
+                    "cache_hit": True,
+                    "attempts": 0,
+                    "retry_wait_seconds": 0.0
+                }
+                if subtitles:
+                    write_subtitle_file(cached_words, subtitle_path, subtitles)
+                    result["subtitle_path"] = subtitle_path
+                result["timings"] = {"file_written": round(time.monotonic() - started, 4)}
+                result["durations"] = stage_durations(result["timings"])
+                return result
         
-        # 生成音频文件
-        await communicate.save(output_path)
+        # 输出文件可能是缓存的硬链接，先删除再写入，避免改写缓存内容
+        if os.path.lexists(output_path):
+            os.remove(output_path)
         
-        # 检查文件是否真的生成了
-        if os.path.exists(output_path):
-            file_size = os.path.getsize(output_path)
-            logger.info(f"音频文件生成成功: {output_path}, 大小: {file_size} bytes")
+        logger.info(f"开始合成并保存到: {output_path}")
+        synth_started = time.monotonic()
+        words = [] if subtitles else None
+        chunks = [text]
+        if (CHUNKED_SYNTHESIS if chunked is None else chunked) and len(text.split()) > CHUNK_MIN_WORDS:
+            chunks = split_into_chunks(text)
+        if len(chunks) > 1:
+            logger.info(f"长脚本分段并行合成: {len(chunks)} 段")
+            attempts, wait_seconds = await synthesize_chunked(chunks, voice, params, output_path, timings, words)
         else:
-            logger.error(f"音频文件未生成: {output_path}")
-            return {
-                "success": False,
-                "error": "文件未生成",
-                "file_path": output_path
-            }
+            attempts, wait_seconds = await synthesize_with_retry(text, voice, params, output_path, timings, words)
         
-        return {
+        file_size = os.path.getsize(output_path)
+        METRIC_SYNTH_SECONDS.observe(time.monotonic() - synth_started, voice=voice, emotion=emotion)
+        METRIC_SYNTH_TOTAL.inc(voice=voice, emotion=emotion, outcome="success")
+        METRIC_AUDIO_BYTES.inc(file_size, voice=voice, source="synthesis")
+        logger.info(f"音频文件生成成功: {output_path}, 大小: {file_size} bytes, 尝试次数: {attempts}")
+        if cache_key:
+            AUDIO_CACHE.store(cache_key, output_path)
+            if subtitles:
+                AUDIO_CACHE.store_words(cache_key, words)
+        
+        result = {
             "success": True,
             "file_path": output_path,
-            "params": params
+            "params": params,
+            "cache_hit": False,
+            "attempts": attempts,
+            "retry_wait_seconds": round(wait_seconds, 3),
+            "chunks": len(chunks)
         }
+        if subtitles:
+            write_subtitle_file(words, subtitle_path, subtitles)
+            result["subtitle_path"] = subtitle_path
+        result["timings"] = relative_timings(timings, started)
+        result["durations"] = stage_durations(result["timings"])
+        return result
     except Exception as e:
         logger.error(f"生成音频失败: {text[:50]}... - {str(e)}")
+        METRIC_SYNTH_TOTAL.inc(voice=voice, emotion=emotion, outcome="failure")
         logger.error(f"详细错误信息: {type(e).__name__}: {str(e)}")
         import traceback
         logger.error(f"错误堆栈: {traceback.format_exc()}")
         return {
             "success": False,
             "error": str(e),
-            "file_path": output_path
+            "file_path": output_path,
+            "attempts": getattr(e, "attempts", 1),
+            "retry_wait_seconds": round(getattr(e, "wait_seconds", 0.0), 3),
+            "timings": relative_timings(timings, started),
+            "durations": stage_durations(relative_timings(timings, started))
         }
 
-async def process_scripts_batch(scripts, product_name, discount, emotion="Friendly", voice=DEFAULT_VOICE, emotions=None, voices=None, rates=None, pitches=None, volumes=None):
-    """批量处理脚本"""
+def make_batch_id(product_name, scripts):
+    """根据产品名与脚本内容生成稳定的批次ID（同一批次重复提交时ID相同）"""
+    payload = json.dumps([product_name, scripts], ensure_ascii=False, sort_keys=True)
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()[:16]
+
+def get_text_hash(text):
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+class BatchCheckpoint:
+    """批次断点清单 - 以 JSON Lines 追加记录已完成脚本
+
+    服务重启或请求超时后重新提交同一批次，已完成且文件非空的脚本直接跳过。
+    多个工作进程可以同时追加同一清单（每行一次 O_APPEND 写入）。
+    """
+    
+    def __init__(self, product_dir, batch_id):
+        self.batch_id = "".join(c for c in str(batch_id) if c.isalnum() or c in "-_") or "default"
+        self.path = os.path.join(product_dir, CHECKPOINT_DIR_NAME, f"{self.batch_id}.jsonl")
+        self.completed = self._load()
+    
+    def _load(self):
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # 进程中断时可能留下不完整的最后一行
+                completed[entry.get("index")] = entry
+        return completed
+    
+    def lookup(self, plan):
+        """返回可复用的清单记录；输入有变化或文件缺失/为空时返回 None"""
+        entry = self.completed.get(plan["index"] + 1)
+        if entry is None:
+            return None
+        if (entry.get("text_hash") != get_text_hash(plan["text"])
+                or entry.get("voice") != plan["voice"]
+                or entry.get("emotion") != plan["emotion"]
+                or entry.get("file_path") != plan["audio_path"]):
+            return None
+        try:
+            if os.path.getsize(plan["audio_path"]) <= 0:
+                return None
+        except OSError:
+            return None
+        return entry
+    
+    def record(self, result, plan):
+        """追加一条已完成记录"""
+        entry = {
+            "index": plan["index"] + 1,
+            "file_path": plan["audio_path"],
+            "text_hash": get_text_hash(plan["text"]),
+            "voice": plan["voice"],
+            "emotion": plan["emotion"],
+            "params": result.get("params", {}),
+            "completed_at": datetime.now().isoformat()
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            self.completed[entry["index"]] = entry
+        except OSError as e:
+            logger.warning(f"写入断点清单失败: {self.path} - {str(e)}")
+    
+    def completed_results(self, scripts, subtitles=None):
+        """把清单中与当前脚本一致、文件完好的记录转换为成功结果（用于补记未回传的结果）"""
+        results = []
+        for index, entry in sorted((k, v) for k, v in self.completed.items() if isinstance(k, int)):
+            if not 1 <= index <= len(scripts):
+                continue
+            script = scripts[index - 1]
+            text = script if isinstance(script, str) else script.get("english_script", str(script))
+            file_path = entry.get("file_path")
+            if entry.get("text_hash") != get_text_hash(text) or not file_path:
+                continue
+            try:
+                if os.path.getsize(file_path) <= 0:
+                    continue
+            except OSError:
+                continue
+            result = {
+                "success": True,
+                "index": index,
+                "file_path": file_path,
+                "params": entry.get("params", {}),
+                "emotion": entry.get("emotion"),
+                "voice": entry.get("voice"),
+                "voice_info": get_voice_info(entry.get("voice")),
+                "text": text
+            }
+            subtitle_path = get_subtitle_path(file_path, subtitles) if subtitles else None
+            if subtitle_path and os.path.exists(subtitle_path):
+                result["subtitle_path"] = subtitle_path
+            results.append(result)
+        return results
+
+async def process_scripts_batch(scripts, product_name, discount, emotion="Friendly", voice=DEFAULT_VOICE, emotions=None, voices=None, rates=None, pitches=None, volumes=None, on_result=None, indices=None, batch_id=None, chunked=None, subtitles=None, deadline_at=None):
+    """批量处理脚本
+
+    on_result: 可选回调，每个脚本完成后以单条结果调用（用于任务进度上报）
+    indices: 可选，scripts 中每条脚本在整批中的原始序号（多进程分片时使用），
+             emotions/voices/rates 等列表按原始序号索引
+    batch_id: 断点清单ID，相同ID重新提交时跳过已完成的脚本（默认按产品与脚本内容生成）
+    chunked: 长脚本是否分段并行合成（None 时使用服务默认配置）
+    subtitles: "srt" / "vtt" 时为每条音频同时生成字幕文件
+    deadline_at: 整批期限（time.time() 时间戳），到期时取消未完成的脚本并记为失败，
+                 已完成的音频与断点清单保留
+    """
     # 创建产品输出目录
     product_dir = f"outputs/{product_name}"
     os.makedirs(product_dir, exist_ok=True)
     
+    checkpoint = BatchCheckpoint(product_dir, batch_id or make_batch_id(product_name, scripts))
+    selector = AdaptiveVoiceSelector() if VOICE_SELECTION == "adaptive" else None
+    
     results = []
     successful = 0
     failed = 0
     start_time = datetime.now()
     
-    # 创建信号量控制并发数
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
-    
-    async def process_single_script(script, index):
-        async with semaphore:
-            # 如果script是字符串，直接使用；如果是字典，提取text
-            if isinstance(script, str):
-                text = script
-                # 使用GPTs提供的参数（如果存在）
-                script_emotion = emotions[index] if emotions and index < len(emotions) and emotions[index] else emotion
-                script_voice = voices[index] if voices and index < len(voices) and voices[index] else voice
-            else:
-                text = script.get("english_script", str(script))
-                script_emotion = script.get("emotion", emotions[index] if emotions and index < len(emotions) and emotions[index] else emotion)
-                script_voice = script.get("voice", voices[index] if voices and index < len(voices) and voices[index] else voice)
-            
-            # 如果没有指定语音，使用动态语音选择
-            if not script_voice or script_voice == DEFAULT_VOICE:
-                script_voice = get_voice_for_emotion(script_emotion, index)
-            
-            # 生成音频文件名（包含语音模型信息）
-            voice_name = get_voice_info(script_voice)["name"]
-            audio_filename = f"tts_{index+1:04d}_{script_emotion}_{voice_name}.mp3"
-            audio_path = f"{product_dir}/{audio_filename}"
-            
-            # 生成音频
-            result = await generate_single_audio(text, script_voice, script_emotion, audio_path)
-            result["index"] = index + 1
-            result["emotion"] = script_emotion
-            result["voice"] = script_voice
-            result["voice_info"] = get_voice_info(script_voice)
-            result["text"] = text
-            
-            # 添加GPTs参数信息
-            if rates and index < len(rates) and rates[index]:
-                result["rate"] = rates[index]
-            if pitches and index < len(pitches) and pitches[index]:
-                result["pitch"] = pitches[index]
-            if volumes and index < len(volumes) and volumes[index]:
-                result["volume"] = volumes[index]
-            
-            return result
+    def plan_script(script, index):
+        """解析单条脚本的文本、情绪与请求的语音（动态选择的语音在分组后确定）"""
+        # 如果script是字符串，直接使用；如果是字典，提取text
+        if isinstance(script, str):
+            text = script
+            # 使用GPTs提供的参数（如果存在）
+            script_emotion = emotions[index] if emotions and index < len(emotions) and emotions[index] else emotion
+            script_voice = voices[index] if voices and index < len(voices) and voices[index] else voice
+        else:
+            text = script.get("english_script", str(script))
+            script_emotion = script.get("emotion", emotions[index] if emotions and index < len(emotions) and emotions[index] else emotion)
+            script_voice = script.get("voice", voices[index] if voices and index < len(voices) and voices[index] else voice)
+        
+        # 没有指定语音或语音不存在时为 None，按情绪动态选择
+        script_voice = requested_voice(script_voice)
+        
+        # 断点清单中该脚本上次使用的动态语音（续传时沿用）
+        previous = checkpoint.completed.get(index + 1)
+        preferred = None
+        if (script_voice is None and previous and previous.get("text_hash") == get_text_hash(text)
+                and previous.get("emotion") == script_emotion
+                and previous.get("voice") in emotion_voices(script_emotion)):
+            preferred = previous.get("voice")
+        
+        plan = {
+            "index": index,
+            "text": text,
+            "emotion": script_emotion,
+            "requested_voice": script_voice,
+            "preferred_voice": preferred
+        }
+        assign_voice(plan, script_voice or preferred)
+        return plan
     
-    # 并发处理所有脚本
-    tasks = [process_single_script(script, i) for i, script in enumerate(scripts)]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    def assign_voice(plan, script_voice):
+        """确定脚本语音并生成输出路径（文件名包含语音模型信息）"""
+        plan["voice"] = script_voice
+        if script_voice is None:
+            plan["audio_path"] = plan["subtitle_path"] = None
+            return
+        voice_name = get_voice_info(script_voice)["name"]
+        audio_filename = f"tts_{plan['index']+1:04d}_{plan['emotion']}_{voice_name}.mp3"
+        
+        audio_path = f"{product_dir}/{audio_filename}"
+        plan["audio_path"] = audio_path
+        plan["subtitle_path"] = get_subtitle_path(audio_path, subtitles) if subtitles else None
+    
+    def finish_result(result, plan):
+        """补充脚本信息并上报单条结果"""
+        index = plan["index"]
+        result["index"] = index + 1
+        result["emotion"] = plan["emotion"]
+        result["voice"] = plan["voice"]
+        result["voice_info"] = get_voice_info(plan["voice"])
+        result["text"] = plan["text"]
+        
+        # 添加GPTs参数信息
+        if rates and index < len(rates) and rates[index]:
+            result["rate"] = rates[index]
+        if pitches and index < len(pitches) and pitches[index]:
+            result["pitch"] = pitches[index]
+        if volumes and index < len(volumes) and volumes[index]:
+            result["volume"] = volumes[index]
+        
+        if result.get("success") and not result.get("resumed"):
+            checkpoint.record(result, plan)
+        
+        if on_result:
+            on_result(result)
+        
+        return result
+    
+    if indices is None:
+        indices = range(len(scripts))
+    plans = []
+    for position, (script, index) in enumerate(zip(scripts, indices)):
+        plan = plan_script(script, index)
+        plan["position"] = position
+        plans.append(plan)
+    
+    # 断点续传：清单中已完成且文件完好的脚本直接复用
+    results = [None] * len(plans)
+    resumed = 0
+    pending_plans = []
+    for plan in plans:
+        entry = checkpoint.lookup(plan) if plan["voice"] else None
+        if entry is not None and plan["subtitle_path"] and not os.path.exists(plan["subtitle_path"]):
+            # 需要字幕但上次没有生成，重新合成
+            entry = None
+        if entry is None:
+            pending_plans.append(plan)
+            continue
+        resumed_result = {
+            "success": True,
+            "file_path": plan["audio_path"],
+            "params": entry.get("params", {}),
+            "resumed": True,
+            "cache_hit": False,
+            "attempts": 0,
+            "retry_wait_seconds": 0.0
+        }
+        if plan["subtitle_path"]:
+            resumed_result["subtitle_path"] = plan["subtitle_path"]
+        results[plan["position"]] = finish_result(resumed_result, plan)
+        resumed += 1
+    if resumed:
+        logger.info(f"断点续传: 批次 {checkpoint.batch_id} 跳过 {resumed} 条已完成脚本")
+    
+    # 批内去重：相同 (文本, 请求的语音, 情绪) 只合成一次，结果分发给所有重复行；
+    # 动态语音在分组后按组长的序号确定一次，重复行不会因轮换分到不同语音
+    groups = OrderedDict()
+    for plan in pending_plans:
+        groups.setdefault((plan["text"], plan["requested_voice"], plan["emotion"]), []).append(plan)
+    for group in groups.values():
+        leader = group[0]
+        if selector is not None and leader["requested_voice"] is None and leader["preferred_voice"] is None:
+            continue  # 自适应选择在派发时确定语音
+        group_voice = resolve_voice(leader["requested_voice"], leader["emotion"], leader["index"],
+                                    selector, leader["preferred_voice"])
+        for plan in group:
+            assign_voice(plan, group_voice)
+    
+    window = DispatchWindow() if selector is not None else None
+    
+    async def process_group(group):
+        leader = group[0]
+        if leader["voice"] is None:
+            # 自适应选择：进入派发窗口后按最新的语音统计选择
+            async with window:
+                group_voice = selector.choose(leader["emotion"])
+                for plan in group:
+                    assign_voice(plan, group_voice)
+                return await synthesize_group(group)
+        return await synthesize_group(group)
+    
+    async def synthesize_group(group):
+        leader = group[0]
+        # 生成音频（上游并发由全局自适应限流器控制）
+        leader_result = await generate_single_audio(leader["text"], leader["voice"], leader["emotion"], leader["audio_path"], chunked, subtitles)
+        
+        group_results = [(leader["position"], finish_result(leader_result, leader))]
+        for plan in group[1:]:
+            result = dict(leader_result)
+            result["file_path"] = plan["audio_path"]
+            result["duplicate_of"] = leader["index"] + 1
+            # 重复行没有自己的上游请求，不带耗时，避免阶段统计重复计数
+            result.pop("timings", None)
+            result.pop("durations", None)
+            if plan["subtitle_path"]:
+                result["subtitle_path"] = plan["subtitle_path"]
+            if leader_result.get("success"):
+                try:
+                    place_file(leader["audio_path"], plan["audio_path"])
+                    if plan["subtitle_path"]:
+                        place_file(leader["subtitle_path"], plan["subtitle_path"])
+                except OSError as e:
+                    result["success"] = False
+                    result["error"] = f"复制重复脚本音频失败: {str(e)}"
+            group_results.append((plan["position"], finish_result(result, plan)))
+        return group_results
+    
+    if len(groups) < len(pending_plans):
+        logger.info(f"批内去重: {len(pending_plans)} 条脚本合并为 {len(groups)} 次合成")
+    
+    # 并发处理所有去重后的脚本，再按原始顺序展开
+    group_list = list(groups.values())
+    tasks = [asyncio.ensure_future(process_group(group)) for group in group_list]
+    try:
+        if tasks:
+            timeout = max(deadline_at - time.time(), 0) if deadline_at else None
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            if pending:
+                logger.warning(f"批次 {checkpoint.batch_id} 超过期限，取消 {len(pending)} 组未完成的脚本")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+    except asyncio.CancelledError:
+        # 整批被取消：立即取消全部子任务，释放排队与在途的上游名额
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    
+    for group, task in zip(group_list, tasks):
+        if task.cancelled():
+            for plan in group:
+                results[plan["position"]] = finish_result({
+                    "success": False,
+                    "error": "超过批次期限，未完成的脚本已取消",
+                    "deadline_exceeded": True
+                }, plan)
+        elif task.exception() is not None:
+            for plan in group:
+                results[plan["position"]] = task.exception()
+        else:
+            for position, result in task.result():
+                results[position] = result
     
     # 统计结果
     for result in results:
@@ -276,77 +2229,622 @@ async def process_scripts_batch(scripts, product_name, discount, emotion="Friend
         "results": results,
         "successful": successful,
         "failed": failed,
+        "resumed": resumed,
+        "batch_id": checkpoint.batch_id,
         "duration_seconds": duration
     }
 
-def generate_excel_output(scripts, product_name, discount, results):
-    """生成 Excel 输出文件"""
-    # 创建产品输出目录
-    product_dir = f"outputs/{product_name}"
-    os.makedirs(product_dir, exist_ok=True)
+def normalize_result(result, index):
+    """把 gather 返回的异常转换为普通失败结果（便于跨进程传递与序列化）"""
+    if isinstance(result, dict):
+        return result
+    return {
+        "success": False,
+        "error": f"{type(result).__name__}: {str(result)}",
+        "index": index + 1
+    }
+
+def _drain_result_queue(result_queue, timeout):
+    """等待并取出工作进程回传的脚本结果（在线程池中执行，避免阻塞事件循环）"""
+    items = []
+    try:
+        items.append(result_queue.get(timeout=timeout))
+        while True:
+            items.append(result_queue.get_nowait())
+    except queue.Empty:
+        pass
+    return items
+
+def budget_parts():
+    """多进程模式下并发预算的份数：每个工作进程一份，前端进程（小批次、流式与试听）一份"""
+    return WORKER_PROCESSES + 1
+
+def _init_worker_process():
+    """工作进程初始化：每个进程拥有独立的事件循环，并发预算按 budget_parts() 均分"""
+    UPSTREAM_LIMITER.split_budget(budget_parts())
+    SERVICE_LOOP.start()
+
+async def _run_until_cancelled(coro, cancel_event):
+    """运行分片协程，前端设置取消标志（Manager Event）后立即取消，释放本进程的上游名额"""
+    task = asyncio.ensure_future(coro)
+    loop = asyncio.get_running_loop()
+    while not task.done():
+        await asyncio.wait([task], timeout=WORKER_CANCEL_POLL_INTERVAL)
+        if not task.done() and await loop.run_in_executor(None, cancel_event.is_set):
+            task.cancel()
+            break
+    return await task
+
+def _run_batch_shard(shard):
+    """在工作进程中处理一个分片，返回结果与本进程统计
+
+    每条脚本完成时立即写入共享结果队列（Manager Queue），前端据此逐条更新任务进度。
+    """
+    started = time.monotonic()
+    result_queue = shard["result_queue"]
     
-    # 准备 Excel 数据
-    excel_data = []
-    date_str = datetime.now().strftime("%Y-%m-%d")
+    def on_result(result):
+        try:
+            result_queue.put(result)
+        except Exception as e:
+            # 队列不可用时结果仍随分片返回
+            logger.warning(f"回传脚本结果失败: {str(e)}")
     
-    for i, (script, result) in enumerate(zip(scripts, results)):
-        if isinstance(result, dict) and result.get("success"):
-            # 成功生成音频
-            emotion = "Friendly"  # 默认情绪
-            if isinstance(script, str):
-                english_script = script
-            else:
-                english_script = script.get("english_script", str(script))
-                emotion = script.get("emotion", "Friendly")
-            
-            audio_filename = f"tts_{i+1:04d}_{emotion}.mp3"
-            audio_path = f"outputs/{product_name}/{audio_filename}"
-            
-            excel_data.append({
-                "id": i + 1,
-                "english_script": english_script,
-                "chinese_translation": script.get("chinese_translation", "") if isinstance(script, dict) else "",
-                "emotion": emotion,
-                "voice": script.get("voice", DEFAULT_VOICE) if isinstance(script, dict) else DEFAULT_VOICE,
-                "rate": result.get("params", {}).get("rate", "+2%"),
-                "pitch": result.get("params", {}).get("pitch", "+2%"),
-                "volume": result.get("params", {}).get("volume", "0dB"),
-                "audio_file_path": audio_path
-            })
-        else:
-            # 生成失败
-            if isinstance(script, str):
-                english_script = script
-            else:
-                english_script = script.get("english_script", str(script))
+    try:
+        result = SERVICE_LOOP.run(_run_until_cancelled(run_with_priority(shard["priority"], tenant=shard["tenant"], coro=process_scripts_batch(
+            shard["scripts"], shard["product_name"], shard["discount"],
+            shard["emotion"], shard["voice"],
+            emotions=shard["emotions"], voices=shard["voices"],
+            rates=shard["rates"], pitches=shard["pitches"], volumes=shard["volumes"],
+            indices=shard["indices"], batch_id=shard["batch_id"], chunked=shard["chunked"],
+            subtitles=shard["subtitles"], deadline_at=shard["deadline_at"], on_result=on_result
+        )), shard["cancel_event"]))
+    except (asyncio.CancelledError, FutureCancelledError):
+        # 批次已被取消，前端不再等待本分片的结果
+        logger.info(f"分片已取消: {len(shard['indices'])} 条脚本")
+        return {"pid": os.getpid(), "indices": shard["indices"], "cancelled": True}
+    return {
+        "pid": os.getpid(),
+        "indices": shard["indices"],
+        "results": [normalize_result(r, i) for r, i in zip(result["results"], shard["indices"])],
+        "successful": result["successful"],
+        "failed": result["failed"],
+        "resumed": result["resumed"],
+        "busy_seconds": time.monotonic() - started,
+        "concurrency": UPSTREAM_LIMITER.stats(),
+        "connector": connector_stats(),
+        "audio_cache": AUDIO_CACHE.stats(),
+        "metrics": METRICS.snapshot()
+    }
+
+WORKER_POOL = None
+WORKER_MANAGER = None  # 为每个批次创建跨进程取消标志
+WORKER_POOL_LOCK = threading.Lock()
+WORKER_STATS = {}  # pid -> 该工作进程的累计统计
+
+def get_worker_pool():
+    """按需创建工作进程池（spawn 方式，避免在多线程进程中 fork）
+
+    在服务事件循环中调用；创建工作池时前端进程的限流器同时缩减为一份预算，
+    前端与全部工作进程的上游并发之和不超过 MAX_CONCURRENT。
+    """
+    global WORKER_POOL, WORKER_MANAGER
+    if WORKER_PROCESSES <= 0:
+        return None
+    with WORKER_POOL_LOCK:
+        if WORKER_POOL is None:
+            UPSTREAM_LIMITER.split_budget(budget_parts())
+            context = multiprocessing.get_context("spawn")
+            WORKER_MANAGER = context.Manager()
+            WORKER_POOL = ProcessPoolExecutor(
+                max_workers=WORKER_PROCESSES,
+                mp_context=context,
+                initializer=_init_worker_process
+            )
+            logger.info(f"多进程工作池已启动: {WORKER_PROCESSES} 个工作进程")
+        return WORKER_POOL
+
+def shutdown_worker_pool():
+    global WORKER_POOL, WORKER_MANAGER
+    with WORKER_POOL_LOCK:
+        if WORKER_POOL is not None:
+            WORKER_POOL.shutdown(wait=False, cancel_futures=True)
+            WORKER_POOL = None
+        if WORKER_MANAGER is not None:
+            WORKER_MANAGER.shutdown()
+            WORKER_MANAGER = None
+
+atexit.register(shutdown_worker_pool)
+
+def record_worker_stats(shard_result):
+    pid = shard_result["pid"]
+    with WORKER_POOL_LOCK:
+        stats = WORKER_STATS.setdefault(pid, {
+            "pid": pid,
+            "shards": 0,
+            "scripts": 0,
+            "successful": 0,
+            "failed": 0,
+            "busy_seconds": 0.0
+        })
+        stats["shards"] += 1
+        stats["scripts"] += len(shard_result["results"])
+        stats["successful"] += shard_result["successful"]
+        stats["failed"] += shard_result["failed"]
+        stats["busy_seconds"] = round(stats["busy_seconds"] + shard_result["busy_seconds"], 3)
+        stats["concurrency"] = shard_result["concurrency"]
+        stats["connector"] = shard_result["connector"]
+        stats["audio_cache"] = shard_result["audio_cache"]
+        stats["last_seen"] = datetime.now().isoformat()
+    METRICS.merge_remote(pid, shard_result["metrics"])
+
+def shard_scripts(scripts):
+    """按文本哈希分片：相同文本落在同一分片，保证批内去重仍然有效"""
+    shard_count = max(WORKER_PROCESSES, -(-len(scripts) // WORKER_SHARD_SIZE))
+    buckets = [[] for _ in range(shard_count)]
+    for index, script in enumerate(scripts):
+        text = script if isinstance(script, str) else script.get("english_script", str(script))
+        bucket = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16) % shard_count
+        buckets[bucket].append(index)
+    return [bucket for bucket in buckets if bucket]
+
+async def process_batch_with_workers(pool, scripts, product_name, discount, emotion="Friendly", voice=DEFAULT_VOICE, emotions=None, voices=None, rates=None, pitches=None, volumes=None, on_result=None, batch_id=None, chunked=None, subtitles=None, priority=PRIORITY_BATCH, tenant=None, deadline_at=None):
+    """把批次分片交给工作进程处理，并按原始顺序合并结果
+
+    工作进程每完成一条脚本就通过共享队列回传，on_result 逐条触发，任务进度不必等整个分片结束。
+    被取消时尚未开始的分片不再执行；已在工作进程中运行的分片通过共享的取消标志
+    在 WORKER_CANCEL_POLL_INTERVAL 内停止合成并释放上游名额。
+    """
+    start_time = datetime.now()
+    loop = asyncio.get_running_loop()
+    cancel_event = WORKER_MANAGER.Event()
+    result_queue = WORKER_MANAGER.Queue()
+    
+    futures = []
+    for shard_indices in shard_scripts(scripts):
+        shard = {
+            "scripts": [scripts[i] for i in shard_indices],
+            "indices": shard_indices,
+            "product_name": product_name,
+            "discount": discount,
+            "emotion": emotion,
+            "voice": voice,
+            "emotions": emotions,
+            "voices": voices,
+            "rates": rates,
+            "pitches": pitches,
+            "volumes": volumes,
+            "batch_id": batch_id,
+            "chunked": chunked,
+            "subtitles": subtitles,
+            "priority": priority,
+            "tenant": tenant,
+            "deadline_at": deadline_at,
+            "cancel_event": cancel_event,
+            "result_queue": result_queue
+        }
+        futures.append(loop.run_in_executor(pool, _run_batch_shard, shard))
+    logger.info(f"批次分片: {len(scripts)} 条脚本分为 {len(futures)} 个分片，交给 {WORKER_PROCESSES} 个工作进程")
+    
+    results = [None] * len(scripts)
+    resumed = 0
+    
+    def report(index, result):
+        # 同一条脚本可能先经队列回传、再随分片返回，只上报一次
+        if results[index] is not None:
+            return
+        results[index] = result
+        if on_result:
+            on_result(result)
+    
+    async def stream_results():
+        while True:
+            for result in await loop.run_in_executor(None, _drain_result_queue, result_queue, WORKER_CANCEL_POLL_INTERVAL):
+                report(result["index"] - 1, result)
+    
+    streamer = asyncio.ensure_future(stream_results())
+    try:
+        for completed in asyncio.as_completed(futures):
+            shard_result = await completed
+            record_worker_stats(shard_result)
+            resumed += shard_result["resumed"]
+            for index, result in zip(shard_result["indices"], shard_result["results"]):
+                report(index, result)
+    except asyncio.CancelledError:
+        cancel_event.set()
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        streamer.cancel()
+    
+    successful = sum(1 for r in results if r.get("success"))
+    return {
+        "results": results,
+        "successful": successful,
+        "failed": len(results) - successful,
+        "resumed": resumed,
+        "batch_id": batch_id,
+        "duration_seconds": (datetime.now() - start_time).total_seconds()
+    }
+
+async def run_scripts_batch(scripts, product_name, discount, emotion="Friendly", voice=DEFAULT_VOICE, batch_id=None, priority=PRIORITY_BATCH, tenant=None, deadline_seconds=None, **kwargs):
+    """批量处理入口：启用工作池且批次足够大时分发到工作进程，否则在本进程处理
+
+    priority: 调度优先级（interactive / batch），决定上游名额的分配顺序
+    tenant: 公平调度使用的租户（默认按产品名）
+    deadline_seconds: 整批期限（None 时使用 TTS_BATCH_DEADLINE，0 表示不限）
+    """
+    kwargs["batch_id"] = batch_id or make_batch_id(product_name, scripts)
+    deadline_seconds = BATCH_DEADLINE if deadline_seconds is None else deadline_seconds
+    kwargs["deadline_at"] = time.time() + deadline_seconds if deadline_seconds > 0 else None
+    tenant = tenant or product_name or DEFAULT_TENANT
+    SYNTH_PRIORITY.set(priority)
+    SYNTH_TENANT.set(tenant)
+    pool = get_worker_pool() if len(scripts) >= WORKER_MIN_BATCH else None
+    if pool is not None:
+        mode = "pool"
+        result = await process_batch_with_workers(pool, scripts, product_name, discount, emotion, voice, priority=priority, tenant=tenant, **kwargs)
+    else:
+        mode = "single"
+        result = await process_scripts_batch(scripts, product_name, discount, emotion, voice, **kwargs)
+    
+    METRIC_BATCH_SECONDS.observe(result["duration_seconds"], mode=mode)
+    METRIC_BATCH_SCRIPTS.inc(result["successful"] - result.get("resumed", 0), outcome="success")
+    METRIC_BATCH_SCRIPTS.inc(result["failed"], outcome="failure")
+    METRIC_BATCH_SCRIPTS.inc(result.get("resumed", 0), outcome="resumed")
+    result["stage_timings"] = summarize_stage_timings(result["results"])
+    return result
+
+# Excel 清单列
+MANIFEST_COLUMNS = ["id", "english_script", "chinese_translation", "emotion", "voice", "rate", "pitch", "volume", "audio_file_path", "subtitle_file_path"]
+
+def build_manifest_row(script, index, result):
+    """根据脚本与合成结果生成一行 Excel 清单"""
+    if isinstance(script, str):
+        english_script = script
+        chinese_translation = ""
+        emotion = "Friendly"  # 默认情绪
+        voice = DEFAULT_VOICE
+    else:
+        english_script = script.get("english_script", str(script))
+        chinese_translation = script.get("chinese_translation", "")
+        emotion = script.get("emotion", "Friendly")
+        voice = script.get("voice", DEFAULT_VOICE)
+    
+    if isinstance(result, dict) and result.get("success"):
+        # 成功生成音频
+        params = result.get("params", {})
+        return [
+            index + 1,
+            english_script,
+            chinese_translation,
+            result.get("emotion", emotion),
+            result.get("voice", voice),
+            params.get("rate", "+2%"),
+            params.get("pitch", "+2%"),
+            params.get("volume", "0dB"),
+            result.get("file_path", ""),
+            result.get("subtitle_path", "")
+        ]
+    
+    # 生成失败
+    return [
+        index + 1,
+        english_script,
+        chinese_translation,
+        emotion,
+        voice,
+        "ERROR",
+        "ERROR",
+        "ERROR",
+        "ERROR",
+        "ERROR"
+    ]
+
+class ExcelManifestWriter:
+    """增量 Excel 清单写入器 - openpyxl 只写模式，每条音频完成即追加一行
+
+    行按完成顺序写入（id 列对应原始顺序），内存占用不随批次大小增长；
+    close() 补齐未上报的失败行后保存文件。
+    """
+    
+    def __init__(self, scripts, product_name):
+        # 创建产品输出目录
+        product_dir = f"outputs/{product_name}"
+        os.makedirs(product_dir, exist_ok=True)
+        
+        # 生成 Excel 文件名
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        excel_filename = f"Lior_{date_str}_{product_name}_Batch1_Voice.xlsx"
+        self.path = f"{product_dir}/{excel_filename}"
+        
+        self.scripts = scripts
+        self.rows_written = 0
+        self._written = set()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+        self._sheet.append(MANIFEST_COLUMNS)
+    
+    def add_result(self, result):
+        """追加单条结果（可直接作为 on_result 回调）"""
+        position = result.get("index", 0) - 1 if isinstance(result, dict) else -1
+        if not 0 <= position < len(self.scripts):
+            return
+        with self._lock:
+            if self._closed or position in self._written:
+                return
+            self._sheet.append(build_manifest_row(self.scripts[position], position, result))
+            self._written.add(position)
+            self.rows_written += 1
+    
+    def close(self, results=None):
+        """补齐缺失行并保存，返回 Excel 路径"""
+        with self._lock:
+            if self._closed:
+                return self.path
+            for position, script in enumerate(self.scripts):
+                if position not in self._written:
+                    result = results[position] if results and position < len(results) else None
+                    self._sheet.append(build_manifest_row(script, position, result))
+                    self._written.add(position)
+                    self.rows_written += 1
             
-            excel_data.append({
-                "id": i + 1,
-                "english_script": english_script,
-                "chinese_translation": script.get("chinese_translation", "") if isinstance(script, dict) else "",
-                "emotion": script.get("emotion", "Friendly") if isinstance(script, dict) else "Friendly",
-                "voice": script.get("voice", DEFAULT_VOICE) if isinstance(script, dict) else DEFAULT_VOICE,
-                "rate": "ERROR",
-                "pitch": "ERROR",
-                "volume": "ERROR",
-                "audio_file_path": "ERROR"
-            })
+            # 先写临时文件再替换，避免读到写了一半的清单
+            temp_path = f"{self.path}.tmp"
+            self._workbook.save(temp_path)
+            os.replace(temp_path, self.path)
+            self._closed = True
+            return self.path
+
+def generate_excel_output(scripts, product_name, discount, results):
+    """生成 Excel 输出文件（一次性写入全部结果）"""
+    return ExcelManifestWriter(scripts, product_name).close(results)
+
+def build_generate_response(data, result, excel_path):
+    """组装 /generate 与异步任务共用的结果结构"""
+    product_name = data.get('product_name', 'Unknown_Product')
+    scripts = data.get('scripts', [])
     
-    # 创建 DataFrame
-    df = pd.DataFrame(excel_data)
+    # 生成样本音频列表
+    sample_audios = []
+    emotion = data.get('emotion', 'Friendly')  # 从请求中获取情绪
+    for i, script in enumerate(scripts[:3]):  # 取前3个作为样本
+        # 如果script是字典，使用其中的emotion，否则使用默认emotion
+        script_emotion = emotion
+        if isinstance(script, dict) and 'emotion' in script:
+            script_emotion = script['emotion']
+        audio_filename = f"tts_{i+1:04d}_{script_emotion}.mp3"
+        sample_audios.append(f"outputs/{product_name}/{audio_filename}")
     
-    # 生成 Excel 文件名
-    excel_filename = f"Lior_{date_str}_{product_name}_Batch1_Voice.xlsx"
-    excel_path = f"{product_dir}/{excel_filename}"
+    return {
+        "product_name": product_name,
+        "total_scripts": len(scripts),
+        "output_excel": excel_path,
+        "audio_directory": f"outputs/{product_name}/",
+        "sample_audios": sample_audios,
+        "batch_id": result.get("batch_id"),
+        "summary": {
+            "successful": result["successful"],
+            "failed": result["failed"],
+            "resumed": result.get("resumed", 0),
+            "duration_seconds": result["duration_seconds"],
+            "stage_timings": result.get("stage_timings", {}),
+            "excel_seconds": result.get("excel_seconds")
+        }
+    }
+
+# 异步任务配置
+JOB_RETENTION = 200  # 内存中保留的已结束任务数量
+JOB_RESULTS_PAGE_SIZE = 100  # 增量结果单次返回上限
+
+class BatchJob:
+    """异步批量合成任务 - 记录状态与逐条结果"""
     
-    # 保存 Excel 文件
-    df.to_excel(excel_path, index=False)
+    def __init__(self, data):
+        self.job_id = uuid.uuid4().hex
+        self.data = data
+        self.product_name = data.get('product_name', 'Unknown_Product')
+        self.total = len(data.get('scripts', []))
+        self.status = "queued"  # queued / running / cancelling / completed / failed / cancelled
+        self.results = []  # 按完成顺序追加，供增量拉取
+        self.script_status = ["pending"] * self.total
+        self.successful = 0
+        self.failed = 0
+        self.response = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._lock = threading.Lock()
     
-    return excel_path
+    def cancel(self):
+        """请求取消任务，返回是否已发出取消（已结束的任务返回 False）
+
+        排队中的任务直接结束；运行中的任务取消后台协程，由 run_batch_job 收尾：
+        已完成的音频文件保留，Excel 清单写入已完成的行。
+        """
+        with self._lock:
+            if self.is_finished() or self.status == "cancelling":
+                return False
+            if self.status == "running":
+                self.status = "cancelling"
+        if self.future is not None and not self.future.cancel() and self.future.done():
+            # 任务在加锁之后、取消之前已经结束：恢复真实的结束状态
+            with self._lock:
+                if self.status == "cancelling":
+                    self.status = "failed" if self.error else "completed"
+                    self.finished_at = self.finished_at or datetime.now()
+            return False
+        return True
+    
+    def set_status(self, status):
+        """在锁内更新状态，同时记录开始 / 结束时间（与 cancel() 互斥）"""
+        with self._lock:
+            self.status = status
+            if status == "running":
+                self.started_at = datetime.now()
+            elif status in ("completed", "failed", "cancelled"):
+                self.finished_at = datetime.now()
+    
+    def _on_future_done(self, future):
+        # 任务在开始运行前被取消时，run_batch_job 不会执行，在这里结束任务
+        if future.cancelled():
+            with self._lock:
+                if self.status == "queued":
+                    self.status = "cancelled"
+                    self.finished_at = datetime.now()
+    
+    def record_result(self, result):
+        """记录单条脚本结果（在后台事件循环中调用，同一脚本只记录一次）"""
+        with self._lock:
+            position = result.get("index", 0) - 1
+            succeeded = bool(result.get("success"))
+            if 0 <= position < self.total:
+                if self.script_status[position] != "pending":
+                    return
+                self.script_status[position] = "succeeded" if succeeded else "failed"
+            self.results.append(result)
+            if succeeded:
+                self.successful += 1
+            else:
+                self.failed += 1
+    
+    def is_finished(self):
+        return self.status in ("completed", "failed", "cancelled")
+    
+    def results_since(self, cursor, limit=JOB_RESULTS_PAGE_SIZE):
+        """返回 cursor 之后已完成的结果"""
+        with self._lock:
+            cursor = max(0, cursor)
+            chunk = self.results[cursor:cursor + limit]
+            return chunk, cursor + len(chunk), len(self.results)
+    
+    def to_dict(self, include_scripts=True):
+        with self._lock:
+            completed = len(self.results)
+            info = {
+                "job_id": self.job_id,
+                "status": self.status,
+                "product_name": self.product_name,
+                "total_scripts": self.total,
+                "completed": completed,
+                "successful": self.successful,
+                "failed": self.failed,
+                "progress_percent": round(completed / self.total * 100, 2) if self.total else 100.0,
+                "created_at": self.created_at.isoformat(),
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+                "status_url": f"/jobs/{self.job_id}",
+                "results_url": f"/jobs/{self.job_id}/results"
+            }
+            if include_scripts:
+                info["scripts"] = list(self.script_status)
+            if self.response is not None:
+                info["result"] = self.response
+            if self.error:
+                info["error"] = self.error
+            return info
+
+JOBS = {}
+JOBS_LOCK = threading.Lock()
+
+def register_job(job):
+    """登记任务，并清理超出保留数量的已结束任务"""
+    with JOBS_LOCK:
+        JOBS[job.job_id] = job
+        finished = [j for j in JOBS.values() if j.is_finished()]
+        if len(finished) > JOB_RETENTION:
+            finished.sort(key=lambda j: j.finished_at)
+            for old_job in finished[:len(finished) - JOB_RETENTION]:
+                JOBS.pop(old_job.job_id, None)
+
+def get_job(job_id):
+    with JOBS_LOCK:
+        return JOBS.get(job_id)
+
+async def run_batch_job(job):
+    """在后台事件循环中执行异步任务"""
+    data = job.data
+    job.set_status("running")
+    manifest = None
+    try:
+        manifest = ExcelManifestWriter(data.get('scripts', []), job.product_name)
+        
+        def on_result(result):
+            job.record_result(result)
+            manifest.add_result(result)
+        
+        result = await run_scripts_batch(
+            data.get('scripts', []),
+            job.product_name,
+            data.get('discount', 'Special offer available!'),
+            data.get('emotion', 'Friendly'),
+            data.get('voice', DEFAULT_VOICE),
+            batch_id=data.get('batch_id'),
+            on_result=on_result,
+            chunked=parse_chunked_option(data.get('chunked')),
+            subtitles=parse_subtitle_option(data.get('subtitles')),
+            priority=data.get('priority') or PRIORITY_BATCH,
+            tenant=data.get('tenant'),
+            deadline_seconds=parse_deadline_option(data.get('deadline_seconds'))
+        )
+        
+        # 保存 Excel 是阻塞操作，放到线程池避免卡住事件循环
+        loop = asyncio.get_running_loop()
+        excel_started = time.monotonic()
+        excel_path = await loop.run_in_executor(None, manifest.close, result["results"])
+        result["excel_seconds"] = round(time.monotonic() - excel_started, 4)
+        
+        job.response = build_generate_response(data, result, excel_path)
+        job.set_status("completed")
+        logger.info(f"任务完成: {job.job_id} ({job.product_name}), 成功: {result['successful']}, 失败: {result['failed']}")
+    except asyncio.CancelledError:
+        # 取消：子任务已在 process_scripts_batch 中取消并归还名额，这里只保存已完成部分的清单
+        batch_id = data.get('batch_id') or make_batch_id(job.product_name, data.get('scripts', []))
+        
+        def close_cancelled_manifest():
+            # 多进程模式下，工作进程已写入断点清单的脚本可能还没回传，按清单补记后再保存
+            checkpoint = BatchCheckpoint(f"outputs/{job.product_name}", batch_id)
+            for result in checkpoint.completed_results(data.get('scripts', []), parse_subtitle_option(data.get('subtitles'))):
+                job.record_result(result)
+                manifest.add_result(result)
+            return manifest.close()
+        
+        excel_path = None
+        if manifest is not None:
+            try:
+                excel_path = await asyncio.get_running_loop().run_in_executor(None, close_cancelled_manifest)
+            except Exception as e:
+                logger.error(f"任务取消后保存清单失败: {job.job_id} - {str(e)}")
+        job.response = build_generate_response(data, {
+            "successful": job.successful,
+            "failed": job.failed,
+            "batch_id": batch_id,
+            "duration_seconds": (datetime.now() - job.started_at).total_seconds()
+        }, excel_path)
+        job.set_status("cancelled")
+        logger.info(f"任务已取消: {job.job_id} ({job.product_name}), 已完成 {len(job.results)}/{job.total}")
+    except Exception as e:
+        job.error = str(e)
+        job.set_status("failed")
+        logger.error(f"任务失败: {job.job_id} ({job.product_name}) - {str(e)}")
+
+def submit_batch_job(data):
+    """创建异步任务并投递到后台事件循环"""
+    job = BatchJob(data)
+    register_job(job)
+    job.future = SERVICE_LOOP.submit(run_batch_job(job))
+    job.future.add_done_callback(job._on_future_done)
+    logger.info(f"任务已提交: {job.job_id}, 产品: {job.product_name}, 脚本数量: {job.total}")
+    return job
 
 @app.route('/generate', methods=['POST'])
 def generate_voice_content():
-    """生成语音内容的主接口"""
+    """生成语音内容的主接口（传入 "async": true 时以任务模式立即返回）"""
     try:
         # 获取请求数据
         data = request.get_json()
@@ -357,45 +2855,34 @@ def generate_voice_content():
         if not scripts:
             return jsonify({"error": "No scripts provided"}), 400
         
-        logger.info(f"开始处理产品: {product_name}, 脚本数量: {len(scripts)}")
-        
-        # 异步处理脚本
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         try:
-            emotion = data.get('emotion', 'Friendly')
-            voice = data.get('voice', DEFAULT_VOICE)
-            result = loop.run_until_complete(process_scripts_batch(scripts, product_name, discount, emotion, voice))
-        finally:
-            loop.close()
+            subtitles = parse_subtitle_option(data.get('subtitles'))
+            chunked = parse_chunked_option(data.get('chunked'))
+            priority = parse_priority_option(data.get('priority'), len(scripts))
+            deadline_seconds = parse_deadline_option(data.get('deadline_seconds'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        data['tenant'] = resolve_tenant(data)
         
-        # 生成 Excel 输出
-        excel_path = generate_excel_output(scripts, product_name, discount, result["results"])
+        if data.get('async'):
+            job = submit_batch_job(data)
+            return jsonify(job.to_dict(include_scripts=False)), 202
         
-        # 生成样本音频列表
-        sample_audios = []
-        emotion = data.get('emotion', 'Friendly')  # 从请求中获取情绪
-        for i, script in enumerate(scripts[:3]):  # 取前3个作为样本
-            # 如果script是字典，使用其中的emotion，否则使用默认emotion
-            script_emotion = emotion
-            if isinstance(script, dict) and 'emotion' in script:
-                script_emotion = script['emotion']
-            audio_filename = f"tts_{i+1:04d}_{script_emotion}.mp3"
-            sample_audios.append(f"outputs/{product_name}/{audio_filename}")
+        logger.info(f"开始处理产品: {product_name}, 脚本数量: {len(scripts)}")
+        
+        # 异步处理脚本（投递到常驻后台事件循环）
+        emotion = data.get('emotion', 'Friendly')
+        voice = data.get('voice', DEFAULT_VOICE)
+        manifest = ExcelManifestWriter(scripts, product_name)
+        result = SERVICE_LOOP.run(run_scripts_batch(scripts, product_name, discount, emotion, voice, batch_id=data.get('batch_id'), on_result=manifest.add_result, chunked=chunked, subtitles=subtitles, priority=priority, tenant=data['tenant'], deadline_seconds=deadline_seconds))
+        
+        # 生成 Excel 输出（逐条写入的清单在此收尾保存）
+        excel_started = time.monotonic()
+        excel_path = manifest.close(result["results"])
+        result["excel_seconds"] = round(time.monotonic() - excel_started, 4)
         
         # 返回结果
-        response = {
-            "product_name": product_name,
-            "total_scripts": len(scripts),
-            "output_excel": excel_path,
-            "audio_directory": f"outputs/{product_name}/",
-            "sample_audios": sample_audios,
-            "summary": {
-                "successful": result["successful"],
-                "failed": result["failed"],
-                "duration_seconds": result["duration_seconds"]
-            }
-        }
+        response = build_generate_response(data, result, excel_path)
         
         logger.info(f"处理完成: {product_name}, 成功: {result['successful']}, 失败: {result['failed']}")
         return jsonify(response)
@@ -404,6 +2891,138 @@ def generate_voice_content():
         logger.error(f"处理请求失败: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """提交异步批量任务，立即返回任务ID"""
+    try:
+        data = request.get_json()
+        if not data or not data.get('scripts'):
+            return jsonify({"error": "No scripts provided"}), 400
+        
+        try:
+            parse_subtitle_option(data.get('subtitles'))
+            parse_chunked_option(data.get('chunked'))
+            parse_deadline_option(data.get('deadline_seconds'))
+            if data.get('priority') is not None:
+                parse_priority_option(data.get('priority'), len(data['scripts']))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        data['tenant'] = resolve_tenant(data)
+        
+        job = submit_batch_job(data)
+        return jsonify(job.to_dict(include_scripts=False)), 202
+    except Exception as e:
+        logger.error(f"提交任务失败: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """列出内存中的任务"""
+    with JOBS_LOCK:
+        jobs = list(JOBS.values())
+    jobs.sort(key=lambda j: j.created_at, reverse=True)
+    return jsonify({
+        "success": True,
+        "jobs": [job.to_dict(include_scripts=False) for job in jobs],
+        "total_jobs": len(jobs)
+    })
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """查询任务状态与逐条脚本进度"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"任务不存在: {job_id}"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """取消任务：停止排队与在途的合成，已完成的音频与清单保留"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"任务不存在: {job_id}"}), 404
+    if not job.cancel():
+        return jsonify({"success": False, "error": f"任务已结束或正在取消: {job.status}"}), 409
+    logger.info(f"收到取消请求: {job_id}")
+    return jsonify(job.to_dict(include_scripts=False)), 202
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """增量获取已完成的脚本结果（?cursor=N 从第 N 条之后开始）"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"任务不存在: {job_id}"}), 404
+    
+    cursor = request.args.get('cursor', 0, type=int)
+    limit = max(1, min(request.args.get('limit', JOB_RESULTS_PAGE_SIZE, type=int), JOB_RESULTS_PAGE_SIZE))
+    results, next_cursor, completed = job.results_since(cursor, limit)
+    return jsonify({
+        "job_id": job.job_id,
+        "status": job.status,
+        "results": results,
+        "cursor": cursor,
+        "next_cursor": next_cursor,
+        "completed": completed,
+        "total_scripts": job.total,
+        "has_more": next_cursor < completed or not job.is_finished()
+    })
+
+@app.route('/stream', methods=['GET', 'POST'])
+def stream_voice():
+    """流式语音接口 - 边合成边以 audio/mpeg 分块返回，不落盘"""
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+        else:
+            data = request.args
+        text = data.get('text', '')
+        emotion = data.get('emotion', 'Friendly')
+        voice = data.get('voice') or get_voice_for_emotion(emotion)
+        
+        if not text:
+            return jsonify({"success": False, "error": "文本内容不能为空"}), 400
+        if not VOICE_CATALOG.is_known(voice):
+            return jsonify({"success": False, "error": f"不支持的语音: {voice}"}), 400
+        
+        params = add_random_variation(get_emotion_params(emotion), random.Random(get_variation_seed(text, voice, emotion))).to_edge_tts()
+        
+        chunks = queue.Queue()
+        future = SERVICE_LOOP.submit(stream_audio_chunks(text, voice, params, chunks, resolve_tenant(data)))
+        
+        # 等到首个音频块再返回响应，合成失败时可以返回正常的错误码
+        try:
+            first_chunk = chunks.get(timeout=SYNTH_ATTEMPT_TIMEOUT * SYNTH_MAX_ATTEMPTS)
+        except queue.Empty:
+            future.cancel()
+            return jsonify({"success": False, "error": "等待首个音频块超时"}), 504
+        if first_chunk is None or isinstance(first_chunk, Exception):
+            error = str(first_chunk) if first_chunk is not None else "未收到音频数据"
+            return jsonify({"success": False, "error": error}), 502
+        
+        def generate():
+            try:
+                yield first_chunk
+                while True:
+                    chunk = chunks.get()
+                    if chunk is None or isinstance(chunk, Exception):
+                        break
+                    yield chunk
+            finally:
+                # 客户端断开或输出结束时，确保后台合成任务被取消
+                future.cancel()
+        
+        return Response(generate(), mimetype='audio/mpeg', headers={
+            "Cache-Control": "no-cache",
+            "X-Voice": voice,
+            "X-Emotion": emotion,
+            "X-Rate": params["rate"],
+            "X-Pitch": params["pitch"],
+            "X-Volume": params["volume"]
+        })
+    except Exception as e:
+        logger.error(f"流式语音失败: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
@@ -416,15 +3035,24 @@ def health_check():
 
 @app.route('/voices', methods=['GET'])
 def get_voices():
-    """获取所有可用的语音模型"""
+    """获取所有可用的语音模型
+
+    默认返回语音目录中的全部语音（附人工整理的中文说明，目录不可用时即为内置列表）；
+    ?scope=curated 只返回人工整理的语音；?scope=all 另附目录原始条目。
+    """
     try:
-        return jsonify({
+        voices = VOICE_MODELS if request.args.get('scope') == 'curated' else VOICE_CATALOG.voice_models()
+        response = {
             "success": True,
-            "voices": VOICE_MODELS,
+            "voices": voices,
             "emotion_mapping": EMOTION_VOICE_MAPPING,
             "default_voice": DEFAULT_VOICE,
-            "total_voices": len(VOICE_MODELS)
-        })
+            "total_voices": len(voices),
+            "catalog": VOICE_CATALOG.stats()
+        }
+        if request.args.get('scope') == 'all':
+            response["catalog_voices"] = list(VOICE_CATALOG.voices().values())
+        return jsonify(response)
     except Exception as e:
         logger.error(f"获取语音模型失败: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -459,26 +3087,62 @@ def get_voices_for_emotion(emotion):
         logger.error(f"获取情绪语音模型失败: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+def get_worker_status():
+    """多进程工作池状态与各工作进程统计"""
+    with WORKER_POOL_LOCK:
+        per_worker = [dict(stats) for stats in WORKER_STATS.values()]
+    return {
+        "mode": "pool" if WORKER_PROCESSES > 0 else "single",
+        "processes": WORKER_PROCESSES,
+        "started": WORKER_POOL is not None,
+        "shard_size": WORKER_SHARD_SIZE,
+        "min_batch": WORKER_MIN_BATCH,
+        "per_worker": per_worker
+    }
+
 @app.route('/status', methods=['GET'])
 def get_status():
     """获取系统状态"""
     return jsonify({
         "max_concurrent": MAX_CONCURRENT,
+        "concurrency": UPSTREAM_LIMITER.stats(),
+        "connector": connector_stats(),
+        "hedging": HEDGE_CONTROLLER.stats(),
+        "voice_selection": VOICE_SELECTION,
+        "voice_health": VOICE_HEALTH.stats(),
+        "circuit_breaker": UPSTREAM_BREAKER.stats(),
+        "workers": get_worker_status(),
         "supported_emotions": list(EMOTION_PARAMS.keys()),
         "default_voice": DEFAULT_VOICE,
         "output_directory": "outputs/",
-        "log_directory": "logs/"
+        "log_directory": "logs/",
+        "audio_cache": AUDIO_CACHE.stats(),
+        "voice_catalog": VOICE_CATALOG.stats()
     })
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 指标接口"""
+    return Response(METRICS.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
     # 创建必要目录
     create_directories()
     
+    # 启动后台事件循环
+    SERVICE_LOOP.start()
+    
+    # 语音目录过期时后台刷新（不阻塞启动）
+    VOICE_CATALOG.ensure_fresh()
+    
     # 启动服务
     logger.info("🚀 TT-Live-AI A3-TK 语音生成服务启动...")
     logger.info("📡 服务地址: http://localhost:5000")
     logger.info("🔗 生成接口: POST /generate")
+    logger.info("🧾 异步任务: POST /jobs, GET /jobs/<id>")
+    logger.info("🎧 流式预览: GET/POST /stream")
     logger.info("❤️ 健康检查: GET /health")
     logger.info("📊 系统状态: GET /status")
+    logger.info("📈 运行指标: GET /metrics")
     
     app.run(host='0.0.0.0', port=5001, debug=True)
@@ -6,6 +6,7 @@ Web界面主服务
 """
 
 import os
+import sys
 import json
 import asyncio
 import requests
@@ -13,10 +14,15 @@ import hashlib
 import random
 import numpy as np
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
 import logging
 
+# 共享语音目录（edgetts-integration/voice_catalog.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from voice_catalog import VOICE_CATALOG, VOICE_MODELS, EMOTION_VOICE_MAPPING
+from a3_param_planner import plan_a3_params
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -38,45 +44,6 @@ app = Flask(__name__,
 # 启用CORS支持
 CORS(app, origins=['*'])
 
-# TTS服务配置
-# 语音模型池（支持多种语音模型）
-VOICE_MODELS = {
-    # 女性语音模型
-    "en-US-AmandaMultilingualNeural": {"gender": "女性", "style": "Clear, Bright, Youthful", "name": "阿曼达", "description": "清晰、明亮、年轻"},
-    "en-US-AriaNeural": {"gender": "女性", "style": "Crisp, Bright, Clear", "name": "阿里亚", "description": "清脆、明亮、清晰"},
-    "en-US-AvaNeural": {"gender": "女性", "style": "Pleasant, Friendly, Caring", "name": "艾娃", "description": "令人愉悦、友好、关怀"},
-    "en-US-EmmaNeural": {"gender": "女性", "style": "Cheerful, Light-Hearted, Casual", "name": "艾玛", "description": "快乐、轻松、随意"},
-    "en-US-JennyNeural": {"gender": "女性", "style": "Sincere, Pleasant, Approachable", "name": "珍妮", "description": "真诚、愉快、易接近"},
-    "en-US-MichelleNeural": {"gender": "女性", "style": "Confident, Authentic, Warm", "name": "米歇尔", "description": "自信、真实、温暖"},
-    "en-US-NancyNeural": {"gender": "女性", "style": "Confident, Serious, Mature", "name": "南希", "description": "自信、严肃、成熟"},
-    "en-US-SerenaNeural": {"gender": "女性", "style": "Formal, Confident, Mature", "name": "塞雷娜", "description": "正式、自信、成熟"},
-    "en-US-AshleyNeural": {"gender": "女性", "style": "Sincere, Approachable, Honest", "name": "阿什莉", "description": "真诚、易接近、诚实"},
-    
-    # 男性语音模型
-    "en-US-BrandonNeural": {"gender": "男性", "style": "Warm, Engaging, Authentic", "name": "布兰登", "description": "温暖、吸引人、真实"},
-    "en-US-KaiNeural": {"gender": "男性", "style": "Sincere, Pleasant, Bright, Clear, Friendly, Warm", "name": "凯", "description": "真诚、愉快、明亮、清晰、友好、温暖"},
-    "en-US-DavisNeural": {"gender": "男性", "style": "Soothing, Calm, Smooth", "name": "戴维斯", "description": "抚慰、平静、顺畅"},
-    
-    # 中性语音模型
-    "en-US-FableNeural": {"gender": "中性", "style": "Casual, Friendly", "name": "传奇", "description": "随意、友好"}
-}
-
-# 情绪与语音模型映射
-EMOTION_VOICE_MAPPING = {
-    "Excited": ["en-US-AriaNeural", "en-US-EmmaNeural", "en-US-MichelleNeural"],
-    "Confident": ["en-US-NancyNeural", "en-US-SerenaNeural", "en-US-BrandonNeural"],
-    "Empathetic": ["en-US-AvaNeural", "en-US-JennyNeural", "en-US-AshleyNeural"],
-    "Calm": ["en-US-DavisNeural", "en-US-AvaNeural", "en-US-JennyNeural"],
-    "Playful": ["en-US-EmmaNeural", "en-US-AriaNeural", "en-US-FableNeural"],
-    "Urgent": ["en-US-MichelleNeural", "en-US-NancyNeural", "en-US-BrandonNeural"],
-    "Authoritative": ["en-US-SerenaNeural", "en-US-NancyNeural", "en-US-BrandonNeural"],
-    "Friendly": ["en-US-JennyNeural", "en-US-AvaNeural", "en-US-KaiNeural"],
-    "Inspirational": ["en-US-MichelleNeural", "en-US-BrandonNeural", "en-US-AriaNeural"],
-    "Serious": ["en-US-SerenaNeural", "en-US-NancyNeural", "en-US-DavisNeural"],
-    "Mysterious": ["en-US-DavisNeural", "en-US-SerenaNeural", "en-US-AvaNeural"],
-    "Grateful": ["en-US-JennyNeural", "en-US-AvaNeural", "en-US-AshleyNeural"]
-}
-
 # 创建必要的目录
 def create_directories():
     """创建必要的目录结构"""
@@ -106,14 +73,23 @@ def classic():
 
 @app.route('/api/voices', methods=['GET'])
 def get_voices():
-    """获取所有可用的语音模型"""
+    """获取所有可用的语音模型
+
+    默认返回语音目录中的全部语音（附人工整理的中文说明，目录不可用时即为内置列表）；
+    ?scope=curated 只返回人工整理的语音；?scope=all 另附目录原始条目。
+    """
     try:
-        return jsonify({
+        voices = VOICE_MODELS if request.args.get('scope') == 'curated' else VOICE_CATALOG.voice_models()
+        response = {
             "success": True,
-            "voices": VOICE_MODELS,
+            "voices": voices,
             "emotion_mapping": EMOTION_VOICE_MAPPING,
-            "total_voices": len(VOICE_MODELS)
-        })
+            "total_voices": len(voices),
+            "catalog": VOICE_CATALOG.stats()
+        }
+        if request.args.get('scope') == 'all':
+            response["catalog_voices"] = list(VOICE_CATALOG.voices().values())
+        return jsonify(response)
     except Exception as e:
         logger.error(f"获取语音模型失败: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -168,7 +144,8 @@ def voice_preview():
                 "product_name": "preview",
                 "discount": 0,
                 "emotion": emotion,
-                "voice": voice
+                "voice": voice,
+                "priority": "interactive"
             },
             timeout=30
         )
@@ -190,6 +167,49 @@ def voice_preview():
         logger.error(f"语音预览失败: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/voice-preview/stream', methods=['GET', 'POST'])
+def voice_preview_stream():
+    """流式语音预览（转发TTS服务 /stream，边合成边播放）"""
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+        else:
+            data = request.args.to_dict()
+        text = data.get('text', '')
+
+        if not text:
+            return jsonify({"success": False, "error": "文本内容不能为空"}), 400
+
+        tts_response = requests.post(
+            f"{TTS_SERVICE_URL}/stream",
+            json={
+                "text": text,
+                "voice": data.get('voice', 'en-US-JennyNeural'),
+                "emotion": data.get('emotion', 'Friendly')
+            },
+            stream=True,
+            timeout=30
+        )
+
+        if tts_response.status_code != 200:
+            error = tts_response.json().get("error", "TTS生成失败")
+            tts_response.close()
+            return jsonify({"success": False, "error": error}), 502
+
+        def generate():
+            try:
+                for chunk in tts_response.iter_content(chunk_size=None):
+                    if chunk:
+                        yield chunk
+            finally:
+                tts_response.close()
+
+        return Response(generate(), mimetype='audio/mpeg', headers={"Cache-Control": "no-cache"})
+
+    except Exception as e:
+        logger.error(f"流式语音预览失败: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/api/voice-recommendations', methods=['POST'])
 def get_voice_recommendations():
     """根据情绪获取推荐语音"""
@@ -436,26 +456,43 @@ def get_tasks():
         "tasks": []
     })
 
+def dashboard_job(job):
+    """把TTS服务返回的任务信息中的地址改写为控制台代理地址"""
+    job_id = job.get("job_id")
+    if job_id:
+        job["status_url"] = f"/api/jobs/{job_id}"
+        job["results_url"] = f"/api/jobs/{job_id}/results"
+    return job
+
+def submit_tts_job(tts_data):
+    """提交TTS异步任务（立即返回），返回 (任务信息, 状态码)
+
+    大批次同步调用 /generate 会超过请求超时，控制台统一走 /jobs，
+    页面通过 /api/jobs/<job_id> 轮询进度，DELETE 同一地址取消任务。
+    """
+    response = requests.post(
+        f"{TTS_SERVICE_URL}/jobs",
+        json=tts_data,
+        timeout=30
+    )
+    try:
+        job = response.json()
+    except ValueError:
+        job = {"error": f"TTS服务错误: {response.status_code}", "details": response.text}
+    if response.status_code == 202:
+        return dashboard_job(job), 202
+    job.setdefault("error", f"TTS服务错误: {response.status_code}")
+    return job, response.status_code
+
 @app.route('/api/generate', methods=['POST'])
 def generate_voice():
-    """生成语音"""
+    """提交语音生成任务，返回任务ID（进度通过 /api/jobs/<job_id> 查询）"""
     try:
         data = request.get_json()
         
-        # 转发到TTS服务
-        response = requests.post(
-            f"{TTS_SERVICE_URL}/generate",
-            json=data,
-            timeout=300  # 5分钟超时
-        )
-        
-        if response.status_code == 200:
-            return jsonify(response.json())
-        else:
-            return jsonify({
-                "error": f"TTS服务错误: {response.status_code}",
-                "details": response.text
-            }), 500
+        # 转发到TTS服务任务接口
+        job, status_code = submit_tts_job(data)
+        return jsonify(job), status_code
             
     except Exception as e:
         logger.error(f"生成语音失败: {str(e)}")
@@ -463,6 +500,62 @@ def generate_voice():
             "error": str(e)
         }), 500
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_voice_job():
+    """提交异步语音生成任务（立即返回任务ID）"""
+    try:
+        data = request.get_json()
+
+        # 转发到TTS服务任务接口
+        job, status_code = submit_tts_job(data)
+        return jsonify(job), status_code
+
+    except Exception as e:
+        logger.error(f"提交语音任务失败: {str(e)}")
+        return jsonify({
+            "error": str(e)
+        }), 500
+
+@app.route('/api/jobs/<job_id>')
+def get_voice_job(job_id):
+    """查询异步语音生成任务进度"""
+    try:
+        response = requests.get(f"{TTS_SERVICE_URL}/jobs/{job_id}", timeout=10)
+        return jsonify(dashboard_job(response.json())), response.status_code
+    except Exception as e:
+        logger.error(f"查询语音任务失败: {str(e)}")
+        return jsonify({
+            "error": str(e)
+        }), 500
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_voice_job(job_id):
+    """取消异步语音生成任务"""
+    try:
+        response = requests.delete(f"{TTS_SERVICE_URL}/jobs/{job_id}", timeout=10)
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        logger.error(f"取消语音任务失败: {str(e)}")
+        return jsonify({
+            "error": str(e)
+        }), 500
+
+@app.route('/api/jobs/<job_id>/results')
+def get_voice_job_results(job_id):
+    """增量获取异步语音生成任务结果"""
+    try:
+        response = requests.get(
+            f"{TTS_SERVICE_URL}/jobs/{job_id}/results",
+            params=request.args,
+            timeout=10
+        )
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        logger.error(f"获取语音任务结果失败: {str(e)}")
+        return jsonify({
+            "error": str(e)
+        }), 500
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """处理文件上传"""
@@ -531,7 +624,8 @@ class A3DynamicParameterGenerator:
     
     def dynamic_rate(self, base_rate, emotion_type):
         """动态语速调整公式（符合A3标准）"""
-        np.random.seed(self.seed)
+        # 每次调用使用独立的随机数生成器，不修改进程全局随机状态（多线程下结果稳定）
+        rng = np.random.RandomState(self.seed)
         
         emotion_ranges = {
             'Excited': (0.08, 0.15),
@@ -544,15 +638,13 @@ class A3DynamicParameterGenerator:
         
         min_range, max_range = emotion_ranges.get(emotion_type, (0.05, 0.12))
         sine_wave = np.sin(self.script_id * 0.1) * 0.05
-        random_noise = np.random.uniform(-min_range, max_range)
+        random_noise = rng.uniform(-min_range, max_range)
         
         dynamic_adjustment = base_rate + sine_wave + random_noise
         return np.clip(dynamic_adjustment, -0.20, 0.30)
     
     def dynamic_pitch(self, base_pitch, emotion_type):
         """动态音调调整公式（符合A3标准）"""
-        np.random.seed(self.seed + 1000)
-        
         fib_sequence = [0, 1, 1, 2, 3, 5, 8, 13]
         fib_factor = fib_sequence[self.script_id % 8] / 13.0 * 0.1
         log_perturb = np.log1p(self.script_id % 100) * 0.02
@@ -562,8 +654,6 @@ class A3DynamicParameterGenerator:
     
     def dynamic_volume(self, base_volume, emotion_type):
         """动态音量调整公式（符合A3标准）"""
-        np.random.seed(self.seed + 2000)
-        
         prime_sequence = [2, 3, 5, 7, 11, 13, 17, 19]
         prime_factor = prime_sequence[self.script_id % 8] / 19.0 * 0.15
         cosine_wave = np.cos(self.script_id * 0.15) * 0.08
@@ -594,6 +684,14 @@ class A3DynamicParameterGenerator:
             'script_id': self.script_id,
             'product_hash': self.product_hash
         }
+    
+    @staticmethod
+    def generate_batch_params(product_name, emotion_types, script_ids):
+        """批量生成A3标准动态参数（NumPy 单次计算，与逐条 generate_a3_params 结果一致）
+
+        返回 rate（%）、pitch（%）、volume（dB）数组及每条脚本的 seed。
+        """
+        return plan_a3_params(product_name, emotion_types, script_ids, A3_EMOTION_CONFIG)
 
 def parse_text_table(filepath):
     """解析文本表格文件（Markdown表格或纯文本表格）"""
@@ -1010,7 +1108,7 @@ def parse_excel_file(filepath):
 
 @app.route('/api/upload-and-generate', methods=['POST'])
 def upload_and_generate():
-    """上传文件并自动生成语音"""
+    """上传文件并自动提交语音生成任务（返回任务ID）"""
     try:
         if 'file' not in request.files:
             return jsonify({"error": "没有文件"}), 400
@@ -1048,26 +1146,21 @@ def upload_and_generate():
                 "discount": "Special offer available!"
             }
             
-            tts_response = requests.post(
-                f"{TTS_SERVICE_URL}/generate",
-                json=tts_data,
-                timeout=300
-            )
+            job, status_code = submit_tts_job(tts_data)
             
-            if tts_response.status_code == 200:
-                tts_result = tts_response.json()
-                
+            if status_code == 202:
                 return jsonify({
                     "success": True,
                     "filename": filename,
                     "filepath": filepath,
                     "parsed_data": parsed_data,
-                    "generation_result": tts_result
-                })
+                    "job_id": job["job_id"],
+                    "job": job
+                }), 202
             else:
                 return jsonify({
                     "success": False,
-                    "error": f"TTS服务错误: {tts_response.status_code}",
+                    "error": job["error"],
                     "filename": filename,
                     "parsed_data": parsed_data
                 }), 500
@@ -1080,7 +1173,7 @@ def upload_and_generate():
 
 @app.route('/api/generate-from-file', methods=['POST'])
 def generate_from_file():
-    """从已上传的文件生成语音"""
+    """从已上传的文件提交语音生成任务（返回任务ID）"""
     try:
         data = request.get_json()
         filename = data.get('filename')
@@ -1136,26 +1229,21 @@ def generate_from_file():
             "discount": "Special offer available!"
         }
         
-        tts_response = requests.post(
-            f"{TTS_SERVICE_URL}/generate",
-            json=tts_data,
-            timeout=300
-        )
+        job, status_code = submit_tts_job(tts_data)
         
-        if tts_response.status_code == 200:
-            tts_result = tts_response.json()
-            
+        if status_code == 202:
             return jsonify({
                 "success": True,
                 "filename": filename,
                 "filepath": filepath,
                 "parsed_data": parsed_data,
-                "generation_result": tts_result
-            })
+                "job_id": job["job_id"],
+                "job": job
+            }), 202
         else:
             return jsonify({
                 "success": False,
-                "error": f"TTS服务错误: {tts_response.status_code}",
+                "error": job["error"],
                 "parsed_data": parsed_data
             }), 500
             
@@ -1216,7 +1304,7 @@ def start_all_tasks():
 
 @app.route('/api/generate-a3-audio', methods=['POST'])
 def generate_a3_audio():
-    """生成A3标准音频"""
+    """提交A3标准音频生成任务（返回任务ID）"""
     try:
         data = request.get_json()
         scripts = data.get('scripts', [])
@@ -1237,26 +1325,21 @@ def generate_a3_audio():
             "discount": "Special offer available!"
         }
         
-        tts_response = requests.post(
-            f"{TTS_SERVICE_URL}/generate",
-            json=tts_data,
-            timeout=300
-        )
+        job, status_code = submit_tts_job(tts_data)
         
-        if tts_response.status_code == 200:
-            tts_result = tts_response.json()
-            
+        if status_code == 202:
             return jsonify({
                 "success": True,
-                "total_generated": len(scripts),
+                "total_scripts": len(scripts),
                 "batch_id": batch_id,
                 "product_name": product_name,
-                "generation_result": tts_result
-            })
+                "job_id": job["job_id"],
+                "job": job
+            }), 202
         else:
             return jsonify({
                 "success": False,
-                "error": f"TTS服务错误: {tts_response.status_code}"
+                "error": job["error"]
             }), 500
             
     except Exception as e:
@@ -1435,6 +1518,9 @@ if __name__ == '__main__':
     # 创建必要目录
     create_directories()
     
+    # 语音目录过期时后台刷新（不阻塞启动）
+    VOICE_CATALOG.ensure_fresh()
+    
     # 启动服务
     logger.info("🚀 TT-Live-AI 语音生成控制中心启动...")
     logger.info("📡 服务地址: http://localhost:8000")
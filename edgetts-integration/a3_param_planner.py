@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A3 动态参数批量规划器
+与 DynamicParameterGenerator（a3_voice_generator.py）和 A3DynamicParameterGenerator
+（Web 控制台）的逐条公式逐位一致，但一次用 NumPy 向量运算算出整批脚本的
+rate / pitch / volume，不再为每条脚本创建对象、计算 MD5 或重置全局随机种子。
+"""
+
+import hashlib
+
+import numpy as np
+
+# 各情绪语速随机扰动范围 (下限, 上限)，与逐条公式相同
+RATE_NOISE_RANGES = {
+    'Excited': (0.08, 0.15),
+    'Calm': (0.03, 0.08),
+    'Urgent': (0.10, 0.18),
+    'Empathetic': (0.05, 0.10),
+    'Playful': (0.12, 0.20),
+    'Confident': (0.05, 0.12)
+}
+DEFAULT_RATE_NOISE_RANGE = (0.05, 0.12)
+
+FIB_SEQUENCE = np.array([0, 1, 1, 2, 3, 5, 8, 13], dtype=np.float64)
+PRIME_SEQUENCE = np.array([2, 3, 5, 7, 11, 13, 17, 19], dtype=np.float64)
+
+# MT19937 常量（用于复现 np.random.seed(seed) 之后的第一个随机数）
+MT_N = 624
+MT_M = 397
+MT_MATRIX_A = np.uint64(0x9908b0df)
+MT_UPPER_MASK = np.uint64(0x80000000)
+MT_LOWER_MASK = np.uint64(0x7fffffff)
+MT_MASK_32 = np.uint64(0xffffffff)
+
+
+def get_product_hash(product_name):
+    """产品哈希值（与逐条生成器的 _generate_product_hash 相同）"""
+    return int(hashlib.md5(product_name.encode()).hexdigest()[:8], 16) % 10000
+
+
+def _temper(y):
+    y = y ^ (y >> np.uint64(11))
+    y = y ^ ((y << np.uint64(7)) & np.uint64(0x9d2c5680))
+    y = y ^ ((y << np.uint64(15)) & np.uint64(0xefc60000))
+    y = y ^ (y >> np.uint64(18))
+    return y & MT_MASK_32
+
+
+def legacy_first_uniform(seeds):
+    """对每个种子返回 np.random.seed(seed); np.random.random_sample() 的结果
+
+    旧版 RandomState 用 init_genrand 初始化 MT19937 状态，第一个双精度随机数只
+    依赖第 0、1、2、397、398 个状态字，因此只需向量化推进前 399 个状态字。
+    """
+    state = np.asarray(seeds, dtype=np.uint64) & MT_MASK_32
+    needed = {0: state}
+    for i in range(1, MT_M + 2):
+        state = (np.uint64(1812433253) * (state ^ (state >> np.uint64(30))) + np.uint64(i)) & MT_MASK_32
+        if i in (1, 2, MT_M, MT_M + 1):
+            needed[i] = state
+
+    def twisted(k):
+        y = (needed[k] & MT_UPPER_MASK) | (needed[k + 1] & MT_LOWER_MASK)
+        return needed[k + MT_M] ^ (y >> np.uint64(1)) ^ np.where(y & np.uint64(1), MT_MATRIX_A, np.uint64(0))
+
+    a = (_temper(twisted(0)) >> np.uint64(5)).astype(np.float64)
+    b = (_temper(twisted(1)) >> np.uint64(6)).astype(np.float64)
+    return (a * 67108864.0 + b) / 9007199254740992.0
+
+
+def plan_a3_params(product_name, emotions, script_ids, emotion_config):
+    """批量计算 A3 动态参数
+
+    emotions 与 script_ids 一一对应；emotion_config 为情绪基础参数表（rate/pitch 为 %，
+    volume 为 dB/10 前的数值），未知情绪按 Friendly 处理。返回 NumPy 数组：
+    rate（%）、pitch（%）、volume（dB）以及每条脚本的 seed。
+    """
+    script_ids = np.asarray(script_ids, dtype=np.int64)
+    product_hash = get_product_hash(product_name)
+    seeds = (product_hash + script_ids * 137) % 1000000
+
+    fallback = emotion_config["Friendly"]
+    configs = [emotion_config.get(emotion, fallback) for emotion in emotions]
+    base_rate = np.array([c['rate'] for c in configs], dtype=np.float64) / 100.0
+    base_pitch = np.array([c['pitch'] for c in configs], dtype=np.float64) / 100.0
+    base_volume = np.array([c['volume'] for c in configs], dtype=np.float64) / 10.0
+
+    # 语速：正弦波 + 情绪范围内的均匀噪声（噪声等价于逐条 np.random.seed(seed) 后的 uniform）
+    ranges = np.array([RATE_NOISE_RANGES.get(emotion, DEFAULT_RATE_NOISE_RANGE) for emotion in emotions],
+                      dtype=np.float64).reshape(-1, 2)
+    low = -ranges[:, 0]
+    high = ranges[:, 1]
+    sine_wave = np.sin(script_ids * 0.1) * 0.05
+    random_noise = low + (high - low) * legacy_first_uniform(seeds)
+    rate = np.clip(base_rate + sine_wave + random_noise, -0.20, 0.30)
+
+    # 音调：斐波那契因子 + 对数扰动
+    fib_factor = FIB_SEQUENCE[script_ids % 8] / 13.0 * 0.1
+    log_perturb = np.log1p(script_ids % 100) * 0.02
+    pitch = np.clip(base_pitch + fib_factor + log_perturb, -0.12, 0.18)
+
+    # 音量：质数因子 + 余弦波
+    prime_factor = PRIME_SEQUENCE[script_ids % 8] / 19.0 * 0.15
+    cosine_wave = np.cos(script_ids * 0.15) * 0.08
+    volume = np.clip(base_volume + prime_factor + cosine_wave, -0.10, 0.20)
+
+    return {
+        'rate': rate * 100,
+        'pitch': pitch * 100,
+        'volume': volume * 10,
+        'seed': seeds,
+        'product_hash': product_hash
+    }
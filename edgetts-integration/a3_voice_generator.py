@@ -16,6 +16,9 @@ from pathlib import Path
 import argparse
 import numpy as np
 
+from a3_param_planner import plan_a3_params
+from edge_connection import get_shared_connector, close_shared_connector
+
 
 # A3 标准12种情绪参数配置（完全符合文档）
 EMOTION_CONFIG = {
@@ -40,6 +43,9 @@ SAFE_RANGES = {
     'volume': (-50, 50)   # -50% to +50%
 }
 
+# 同时进行的上游合成数上限（整批脚本共用这一预算，避免一次性发出全部请求被限流）
+MAX_CONCURRENT = int(os.environ.get("TTS_CLI_MAX_CONCURRENT", "5"))
+
 
 class DynamicParameterGenerator:
     """动态参数生成器 - 基于 A3 数学动态参数库"""
@@ -59,7 +65,8 @@ class DynamicParameterGenerator:
     
     def dynamic_rate(self, base_rate, emotion_type):
         """动态语速调整公式"""
-        np.random.seed(self.seed)
+        # 每次调用使用独立的随机数生成器，不修改进程全局随机状态（多线程下结果稳定）
+        rng = np.random.RandomState(self.seed)
         
         emotion_ranges = {
             'Excited': (0.08, 0.15),
@@ -72,15 +79,13 @@ class DynamicParameterGenerator:
         
         min_range, max_range = emotion_ranges.get(emotion_type, (0.05, 0.12))
         sine_wave = np.sin(self.script_id * 0.1) * 0.05
-        random_noise = np.random.uniform(-min_range, max_range)
+        random_noise = rng.uniform(-min_range, max_range)
         
         dynamic_adjustment = base_rate + sine_wave + random_noise
         return np.clip(dynamic_adjustment, -0.20, 0.30)
     
     def dynamic_pitch(self, base_pitch, emotion_type):
         """动态音调调整公式"""
-        np.random.seed(self.seed + 1000)
-        
         fib_sequence = [0, 1, 1, 2, 3, 5, 8, 13]
         fib_factor = fib_sequence[self.script_id % 8] / 13.0 * 0.1
         log_perturb = np.log1p(self.script_id % 100) * 0.02
@@ -90,14 +95,17 @@ class DynamicParameterGenerator:
     
     def dynamic_volume(self, base_volume, emotion_type):
         """动态音量调整公式"""
-        np.random.seed(self.seed + 2000)
-        
         prime_sequence = [2, 3, 5, 7, 11, 13, 17, 19]
         prime_factor = prime_sequence[self.script_id % 8] / 19.0 * 0.15
         cosine_wave = np.cos(self.script_id * 0.15) * 0.08
         
         dynamic_volume = base_volume + prime_factor + cosine_wave
         return np.clip(dynamic_volume, -0.10, 0.20)
+    
+    @staticmethod
+    def generate_batch(product_name, emotion_types, script_ids):
+        """批量计算动态参数（与逐条公式结果一致），返回 rate/pitch/volume 数组"""
+        return plan_a3_params(product_name, emotion_types, script_ids, EMOTION_CONFIG)
 
 
 class EdgeTTSConverter:
@@ -141,46 +149,37 @@ def create_ssml(text, voice, emotion="Friendly", dynamic_params=None):
     return ssml.strip()
 
 
-async def generate_single_audio(text, voice, emotion, output_file, script_id=0, enable_dynamic=True):
-    """生成单个音频文件（支持动态参数）"""
+async def generate_single_audio(text, voice, emotion, output_file, script_id=0, enable_dynamic=True, dynamic_params=None):
+    """生成单个音频文件（支持动态参数）
+
+    dynamic_params: 批量预先规划好的参数；未提供且启用动态参数时按输出目录名（产品名）单独计算
+    """
     
     # 动态参数生成
-    if enable_dynamic:
-        product_hash = int(hashlib.md5(output_file.encode()).hexdigest()[:8], 16) % 10000
-        param_gen = DynamicParameterGenerator(product_hash, script_id)
-        
-        base_config = EMOTION_CONFIG.get(emotion, EMOTION_CONFIG["Friendly"])
-        
-        # 计算动态调整
-        base_rate = base_config['rate'] / 100.0
-        base_pitch = base_config['pitch'] / 100.0
-        base_volume = base_config['volume'] / 10.0
-        
-        dynamic_rate = param_gen.dynamic_rate(base_rate, emotion) * 100
-        dynamic_pitch = param_gen.dynamic_pitch(base_pitch, emotion) * 100
-        dynamic_volume = param_gen.dynamic_volume(base_volume, emotion) * 10
-        
+    if enable_dynamic and dynamic_params is None:
+        product_name = Path(output_file).parent.name
+        plan = DynamicParameterGenerator.generate_batch(product_name, [emotion], [script_id])
         dynamic_params = {
-            'rate': dynamic_rate,
-            'pitch': dynamic_pitch,
-            'volume': dynamic_volume
+            'rate': float(plan['rate'][0]),
+            'pitch': float(plan['pitch'][0]),
+            'volume': float(plan['volume'][0])
         }
-    else:
+    elif not enable_dynamic:
         dynamic_params = None
     
     # 创建 SSML
     ssml = create_ssml(text, voice, emotion, dynamic_params)
     
     # 生成音频
-    communicate = edge_tts.Communicate(ssml, voice)
+    communicate = edge_tts.Communicate(ssml, voice, connector=get_shared_connector())
     await communicate.save(output_file)
     
     print(f"✅ [{script_id:03d}] {emotion:12s} → {os.path.basename(output_file)}")
 
 
 async def batch_generate(product_name, scripts, output_dir="outputs", 
-                        emotion=None, voice=None, enable_dynamic=True):
-    """批量生成音频"""
+                        emotion=None, voice=None, enable_dynamic=True, max_concurrent=MAX_CONCURRENT):
+    """批量生成音频（最多 max_concurrent 条同时合成）"""
     
     # 默认配置
     if not voice:
@@ -201,20 +200,39 @@ async def batch_generate(product_name, scripts, output_dir="outputs",
     print(f"动态参数: {'启用' if enable_dynamic else '禁用'}")
     print(f"输出目录: {output_path}")
     print(f"脚本数量: {len(scripts)}")
+    print(f"并发上限: {max_concurrent}")
     print(f"{'='*70}\n")
     
-    # 生成任务列表
+    # 一次性规划整批动态参数
+    plan = None
+    if enable_dynamic:
+        plan = DynamicParameterGenerator.generate_batch(product_name, [emotion] * len(scripts), range(1, len(scripts) + 1))
+    
+    # 生成任务列表（共享同一个并发预算）
+    semaphore = asyncio.Semaphore(max(1, max_concurrent))
+    
+    async def bounded(coro):
+        async with semaphore:
+            return await coro
+    
     tasks = []
     for i, script in enumerate(scripts):
         filename = f"tts_{i+1:03d}_{emotion}.mp3"
         output_file = output_path / filename
+        dynamic_params = None
+        if plan is not None:
+            dynamic_params = {
+                'rate': float(plan['rate'][i]),
+                'pitch': float(plan['pitch'][i]),
+                'volume': float(plan['volume'][i])
+            }
         
-        tasks.append(
+        tasks.append(bounded(
             generate_single_audio(
                 script, voice, emotion, str(output_file), 
-                script_id=i+1, enable_dynamic=enable_dynamic
+                script_id=i+1, enable_dynamic=enable_dynamic, dynamic_params=dynamic_params
             )
-        )
+        ))
     
     # 批量执行
     await asyncio.gather(*tasks)
@@ -264,6 +282,7 @@ async def main():
     parser.add_argument('--output', '-o', default='outputs', help='输出目录')
     parser.add_argument('--config', '-c', help='配置文件路径')
     parser.add_argument('--no-dynamic', action='store_true', help='禁用动态参数')
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENT, help='同时合成的脚本数上限')
     
     args = parser.parse_args()
     
@@ -276,15 +295,19 @@ async def main():
             args.emotion = config.get('emotion', args.emotion)
             args.voice = config.get('voice', args.voice)
     
-    # 生成音频
-    await batch_generate(
-        product_name=args.product,
-        scripts=args.scripts,
-        output_dir=args.output,
-        emotion=args.emotion,
-        voice=args.voice,
-        enable_dynamic=not args.no_dynamic
-    )
+    # 生成音频（整批共用一个连接器，结束时关闭）
+    try:
+        await batch_generate(
+            product_name=args.product,
+            scripts=args.scripts,
+            output_dir=args.output,
+            emotion=args.emotion,
+            voice=args.voice,
+            enable_dynamic=not args.no_dynamic,
+            max_concurrent=args.concurrency
+        )
+    finally:
+        await close_shared_connector()
 
 
 if __name__ == "__main__":
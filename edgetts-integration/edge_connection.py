@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+EdgeTTS 共享连接器
+edge_tts.Communicate 每次合成都会新建 aiohttp 会话；不传 connector 时每个会话
+都带一个新的 TCPConnector，DNS 缓存与连接池随会话一起销毁。这里为每个事件
+循环创建一个共享连接器，TTS 服务、A3 生成脚本与 GUI 的每次合成都传入它，
+并统计连接与 DNS 的复用情况。
+"""
+
+import os
+import asyncio
+import weakref
+import logging
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# 连接池配置
+CONNECTOR_LIMIT = int(os.environ.get("TTS_CONNECTOR_LIMIT", "64"))  # 连接总数上限（应不小于最大合成并发）
+CONNECTOR_LIMIT_PER_HOST = int(os.environ.get("TTS_CONNECTOR_LIMIT_PER_HOST", "0"))  # 单主机连接上限，0 表示不限
+CONNECTOR_KEEPALIVE = float(os.environ.get("TTS_CONNECTOR_KEEPALIVE", "30"))  # 空闲连接保活时间（秒）
+DNS_CACHE_TTL = int(os.environ.get("TTS_DNS_CACHE_TTL", "300"))  # DNS 缓存有效期（秒）
+
+
+class SharedTCPConnector(aiohttp.TCPConnector):
+    """可被多个 ClientSession 共用的连接器
+
+    edge_tts 以 async with ClientSession(connector=...) 使用连接器，会话退出时
+    会关闭连接器，因此 close() 改为空操作，真正释放连接使用 shutdown()。
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0  # 获取连接次数
+        self.new_connections = 0  # 新建连接次数（其余为从连接池复用）
+        self.dns_resolves = 0  # 需要解析主机名的次数
+        self.dns_lookups = 0  # 实际发起 DNS 查询的次数（其余命中缓存）
+
+    async def connect(self, req, traces, timeout):
+        self.requests += 1
+        return await super().connect(req, traces, timeout)
+
+    async def _create_connection(self, req, traces, timeout):
+        self.new_connections += 1
+        return await super()._create_connection(req, traces, timeout)
+
+    async def _resolve_host(self, host, port, traces=None):
+        self.dns_resolves += 1
+        return await super()._resolve_host(host, port, traces=traces)
+
+    async def _resolve_host_with_throttle(self, *args, **kwargs):
+        self.dns_lookups += 1
+        return await super()._resolve_host_with_throttle(*args, **kwargs)
+
+    def close(self, *, abort_ssl=False):
+        # 会话退出时不关闭共享连接器
+        return _noop()
+
+    async def shutdown(self):
+        """关闭连接器与全部连接"""
+        await super().close()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": self.requests - self.new_connections,
+            "dns_resolves": self.dns_resolves,
+            "dns_cache_hits": self.dns_resolves - self.dns_lookups,
+            "closed": self.closed
+        }
+
+
+async def _noop():
+    return None
+
+
+# 事件循环 -> 共享连接器（连接器只能在创建它的事件循环中使用）
+_CONNECTORS = weakref.WeakKeyDictionary()
+
+
+def get_shared_connector():
+    """当前事件循环的共享连接器（首次调用时创建，必须在事件循环内调用）"""
+    loop = asyncio.get_running_loop()
+    connector = _CONNECTORS.get(loop)
+    if connector is None or connector.closed:
+        connector = SharedTCPConnector(
+            limit=CONNECTOR_LIMIT,
+            limit_per_host=CONNECTOR_LIMIT_PER_HOST,
+            keepalive_timeout=CONNECTOR_KEEPALIVE,
+            ttl_dns_cache=DNS_CACHE_TTL
+        )
+        _CONNECTORS[loop] = connector
+        logger.debug(f"已创建共享连接器: limit={CONNECTOR_LIMIT}, keepalive={CONNECTOR_KEEPALIVE}s")
+    return connector
+
+
+async def close_shared_connector():
+    """关闭当前事件循环的共享连接器（事件循环结束前调用）"""
+    connector = _CONNECTORS.pop(asyncio.get_running_loop(), None)
+    if connector is not None:
+        await connector.shutdown()
+
+
+def connector_stats():
+    """本进程所有共享连接器的累计统计"""
+    totals = {"connectors": 0, "requests": 0, "new_connections": 0, "reused_connections": 0,
+              "dns_resolves": 0, "dns_cache_hits": 0}
+    for connector in list(_CONNECTORS.values()):
+        totals["connectors"] += 1
+        for key, value in connector.stats().items():
+            if key in totals:
+                totals[key] += value
+    totals["limit"] = CONNECTOR_LIMIT
+    totals["keepalive_seconds"] = CONNECTOR_KEEPALIVE
+    totals["dns_cache_ttl"] = DNS_CACHE_TTL
+    return totals
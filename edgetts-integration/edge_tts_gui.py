@@ -12,6 +12,9 @@ import threading
 import edge_tts
 import os
 
+from voice_catalog import VOICE_CATALOG
+from edge_connection import get_shared_connector, close_shared_connector
+
 
 class EdgeTTSGUI:
     def __init__(self, root):
@@ -20,6 +23,10 @@ class EdgeTTSGUI:
         self.root.geometry("800x600")
         self.root.resizable(True, True)
         
+        # 常驻事件循环：多次生成/预览共用同一个连接器
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="edge-tts-loop", daemon=True).start()
+        
         # 设置图标（如果有的话）
         try:
             self.root.iconbitmap("icon.ico")
@@ -90,7 +97,7 @@ class EdgeTTSGUI:
         self.voice_combo.set("加载中...")
         
         # 刷新按钮
-        refresh_btn = ttk.Button(voice_frame, text="🔄 刷新", command=self.load_voices)
+        refresh_btn = ttk.Button(voice_frame, text="🔄 刷新", command=self.refresh_voices)
         refresh_btn.grid(row=0, column=2)
         
         # 输出设置区域
@@ -145,35 +152,46 @@ class EdgeTTSGUI:
             self.output_path.set(path)
     
     def load_voices(self):
-        """加载语音列表"""
-        def _load():
-            try:
-                self.status_var.set("正在加载语音列表...")
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                voices = loop.run_until_complete(edge_tts.list_voices())
-                loop.close()
-                
-                # 筛选中文语音
-                chinese_voices = [v for v in voices if v['Locale'].startswith('zh-')]
-                english_voices = [v for v in voices if v['Locale'].startswith('en-')]
-                
-                # 中文优先
-                self.voices = chinese_voices + english_voices
-                
-                # 更新下拉框
-                voice_names = [f"{v['ShortName']} - {v['FriendlyName']}" for v in self.voices]
-                self.voice_combo['values'] = voice_names
-                
-                if self.voices:
-                    self.voice_combo.current(0)
-                
+        """加载语音列表（读取本地语音目录缓存，过期时后台刷新）"""
+        VOICE_CATALOG.add_listener(lambda catalog: self.root.after(0, self.apply_voices))
+        self.apply_voices()
+        VOICE_CATALOG.ensure_fresh()
+    
+    def apply_voices(self):
+        """用当前语音目录更新下拉框"""
+        try:
+            # 中文优先，其次英文
+            self.voices = VOICE_CATALOG.filter(('zh-', 'en-'))
+            
+            # 更新下拉框（刷新后保留当前选择）
+            current = self.voice_combo.get()
+            voice_names = [f"{v['ShortName']} - {v['FriendlyName']}" for v in self.voices]
+            self.voice_combo['values'] = voice_names
+            
+            if current in voice_names:
+                self.voice_combo.current(voice_names.index(current))
+            elif self.voices:
+                self.voice_combo.current(0)
+            
+            if VOICE_CATALOG.source == "builtin":
+                self.status_var.set(f"已加载 {len(self.voices)} 个内置语音，正在后台获取完整语音列表...")
+            else:
                 self.status_var.set(f"已加载 {len(self.voices)} 个语音")
+        except Exception as e:
+            messagebox.showerror("错误", f"加载语音列表失败: {str(e)}")
+            self.status_var.set("加载失败")
+    
+    def refresh_voices(self):
+        """强制从网络刷新语音目录（完成后通过回调更新下拉框）"""
+        def _refresh():
+            try:
+                self.status_var.set("正在刷新语音列表...")
+                VOICE_CATALOG.refresh()
             except Exception as e:
-                messagebox.showerror("错误", f"加载语音列表失败: {str(e)}")
-                self.status_var.set("加载失败")
+                messagebox.showerror("错误", f"刷新语音列表失败: {str(e)}")
+                self.status_var.set("刷新失败，继续使用已缓存的语音列表")
         
-        threading.Thread(target=_load, daemon=True).start()
+        threading.Thread(target=_refresh, daemon=True).start()
     
     def get_voice_short_name(self, display_name):
         """从显示名称获取语音短名称"""
@@ -196,18 +214,13 @@ class EdgeTTSGUI:
                 self.progress.start()
                 self.status_var.set("正在生成语音...")
                 
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
                 voice_name = self.get_voice_short_name(self.voice_combo.get())
                 output_file = os.path.join(
                     self.output_path.get(),
                     f"output_{os.path.basename(voice_name)}.mp3"
                 )
                 
-                communicate = edge_tts.Communicate(text, voice_name)
-                loop.run_until_complete(communicate.save(output_file))
-                loop.close()
+                self.run_async(self.save_audio(text, voice_name, output_file))
                 
                 self.progress.stop()
                 self.generate_btn.config(state='normal')
@@ -223,6 +236,23 @@ class EdgeTTSGUI:
         
         threading.Thread(target=_generate, daemon=True).start()
     
+    def run_async(self, coro):
+        """在常驻事件循环中执行协程并等待结果（从工作线程调用）"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+    
+    async def save_audio(self, text, voice_name, output_file):
+        communicate = edge_tts.Communicate(text, voice_name, connector=get_shared_connector())
+        await communicate.save(output_file)
+    
+    def close(self):
+        """关闭窗口前释放连接器并停止事件循环"""
+        try:
+            asyncio.run_coroutine_threadsafe(close_shared_connector(), self.loop).result(5)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.root.destroy()
+    
     def preview_audio(self):
         """预览音频（保存到临时文件）"""
         text = self.text_input.get("1.0", tk.END).strip()
@@ -237,18 +267,13 @@ class EdgeTTSGUI:
                 self.progress.start()
                 self.status_var.set("正在生成预览...")
                 
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
                 voice_name = self.get_voice_short_name(self.voice_combo.get())
                 output_file = os.path.join(
                     os.path.expanduser("~/Desktop"),
                     "preview.mp3"
                 )
                 
-                communicate = edge_tts.Communicate(text, voice_name)
-                loop.run_until_complete(communicate.save(output_file))
-                loop.close()
+                self.run_async(self.save_audio(text, voice_name, output_file))
                 
                 self.progress.stop()
                 self.preview_btn.config(state='normal')
@@ -270,6 +295,7 @@ class EdgeTTSGUI:
 def main():
     root = tk.Tk()
     app = EdgeTTSGUI(root)
+    root.protocol("WM_DELETE_WINDOW", app.close)
     root.mainloop()
 
 
@@ -3,6 +3,7 @@
 class TTControlCenter {
     constructor() {
         this.isGenerating = false;
+        this.currentJobId = null;
         this.init();
     }
 
@@ -98,7 +99,13 @@ class TTControlCenter {
 
     // 生成语音
     async handleGenerate() {
-        if (this.isGenerating) return;
+        if (this.isGenerating) {
+            // 生成中再次点击按钮即取消任务
+            if (this.currentJobId) {
+                this.cancelJob(this.currentJobId);
+            }
+            return;
+        }
 
         const productName = document.getElementById('productName').value.trim();
         const textContent = document.getElementById('textContent').value.trim();
@@ -145,8 +152,11 @@ class TTControlCenter {
             const result = await response.json();
 
             if (response.ok) {
-                this.showToast('语音生成完成', 'success');
-                this.addLog(`生成完成: 成功${result.summary.successful}个, 失败${result.summary.failed}个`);
+                // 任务已提交，轮询进度直到结束
+                this.showLoading(false);
+                this.addLog(`任务已提交: ${result.job_id}`);
+                const job = await this.waitForJob(result.job_id);
+                this.reportJob(job);
                 this.loadTasks(); // 刷新任务列表
             } else {
                 this.showToast(result.error || '生成失败', 'error');
@@ -157,11 +167,58 @@ class TTControlCenter {
             this.addLog(`生成失败: ${error.message}`);
         } finally {
             this.isGenerating = false;
+            this.currentJobId = null;
             this.updateGenerateButton(false);
             this.showLoading(false);
         }
     }
 
+    // 轮询任务进度直到结束（生成按钮显示进度，可点击取消）
+    async waitForJob(jobId) {
+        this.currentJobId = jobId;
+        while (true) {
+            const response = await fetch(`/api/jobs/${jobId}`);
+            const job = await response.json();
+            if (!response.ok) {
+                throw new Error(job.error || `查询任务失败: ${response.status}`);
+            }
+            this.updateGenerateButton(true, job);
+            if (['completed', 'failed', 'cancelled'].includes(job.status)) {
+                return job;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
+    // 取消正在运行的任务（已完成的音频与清单会保留）
+    async cancelJob(jobId) {
+        try {
+            const response = await fetch(`/api/jobs/${jobId}`, { method: 'DELETE' });
+            const result = await response.json();
+            if (response.ok) {
+                this.addLog(`正在取消任务: ${jobId}`);
+            } else {
+                this.showToast(result.error || '取消失败', 'error');
+            }
+        } catch (error) {
+            this.showToast('取消失败: ' + error.message, 'error');
+        }
+    }
+
+    // 汇报任务最终状态
+    reportJob(job) {
+        if (job.status === 'completed') {
+            this.showToast('语音生成完成', 'success');
+            this.addLog(`生成完成: 成功${job.successful}个, 失败${job.failed}个`);
+        } else if (job.status === 'cancelled') {
+            this.showToast('任务已取消', 'warning');
+            this.addLog(`任务已取消: 已完成${job.completed}/${job.total_scripts}条`);
+        } else {
+            this.showToast(job.error || '生成失败', 'error');
+            this.addLog(`生成失败: ${job.error || '未知错误'}`);
+        }
+    }
+
     // 获取随机情感
     getRandomEmotion() {
         const emotions = ['Calm', 'Friendly', 'Confident', 'Playful', 'Excited', 'Urgent'];
@@ -169,8 +226,14 @@ class TTControlCenter {
     }
 
     // 更新生成按钮状态
-    updateGenerateButton(isGenerating) {
+    updateGenerateButton(isGenerating, job = null) {
         const btn = document.getElementById('generateBtn');
+        if (isGenerating && job) {
+            // 任务运行中：显示进度，按钮用于取消
+            btn.disabled = job.status === 'cancelling';
+            btn.innerHTML = `<i class="fas fa-stop"></i> 取消生成 (${job.completed}/${job.total_scripts})`;
+            return;
+        }
         btn.disabled = isGenerating;
         btn.innerHTML = isGenerating 
             ? '<i class="fas fa-spinner fa-spin"></i> 生成中...'
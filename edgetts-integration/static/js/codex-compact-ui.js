@@ -305,26 +305,30 @@ class CompactVoiceGenerator {
                 })
             });
 
-            if (!response.ok) {
-                throw new Error(`生成失败: ${response.status}`);
-            }
-
             const result = await response.json();
             
-            if (result.success) {
+            if (!response.ok || !result.success) {
+                throw new Error(result.error || `生成失败: ${response.status}`);
+            }
+            
+            // 任务已提交，轮询进度直到结束
+            this.addLogEntry('info', '任务已提交', `任务ID: ${result.job_id}`);
+            const job = await this.waitForJob(result.job_id);
+            
+            if (job.status === 'completed') {
                 this.showToast('语音生成完成！', 'success');
-                this.addLogEntry('success', '生成完成', `成功生成 ${result.generated_files?.length || 0} 个音频文件`);
-                
-                // 更新进度
-                this.updateProgress(result);
+                this.addLogEntry('success', '生成完成', `成功生成 ${job.successful} 个音频文件，失败 ${job.failed} 个`);
                 
                 // 更新历史记录
-                this.addToHistory(result);
+                this.addToHistory(job.result || result);
                 
                 // 启用下载按钮
                 document.getElementById('downloadBtn').disabled = false;
+            } else if (job.status === 'cancelled') {
+                this.showToast('任务已取消', 'warning');
+                this.addLogEntry('warning', '任务已取消', `已完成 ${job.completed}/${job.total_scripts} 条`);
             } else {
-                throw new Error(result.error || '语音生成失败');
+                throw new Error(job.error || '语音生成失败');
             }
 
         } catch (error) {
@@ -334,17 +338,48 @@ class CompactVoiceGenerator {
         }
     }
 
-    updateProgress(result) {
+    // 轮询任务进度直到结束（运行中可取消）
+    async waitForJob(jobId) {
+        while (true) {
+            const response = await fetch(`/api/jobs/${jobId}`);
+            const job = await response.json();
+            if (!response.ok) {
+                throw new Error(job.error || `查询任务失败: ${response.status}`);
+            }
+            this.updateProgress(job);
+            if (['completed', 'failed', 'cancelled'].includes(job.status)) {
+                return job;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
+    async cancelJob(jobId) {
+        try {
+            const response = await fetch(`/api/jobs/${jobId}`, { method: 'DELETE' });
+            const result = await response.json();
+            if (response.ok) {
+                this.addLogEntry('info', '取消任务', `正在取消任务: ${jobId}`);
+            } else {
+                this.showToast(result.error || '取消失败', 'error');
+            }
+        } catch (error) {
+            this.showToast(`取消失败: ${error.message}`, 'error');
+        }
+    }
+
+    updateProgress(job) {
         const progressSection = document.getElementById('overallProgress');
         const progressBar = document.getElementById('progressBar');
         const progressDetails = document.getElementById('progressDetails');
         
         progressSection.style.display = 'block';
         
-        const totalFiles = result.total_scripts || 0;
-        const successFiles = result.summary?.successful || 0;
-        const failedFiles = result.summary?.failed || 0;
+        const totalFiles = job.total_scripts || 0;
+        const successFiles = job.successful || 0;
+        const failedFiles = job.failed || 0;
         const progressPercent = totalFiles > 0 ? Math.round((successFiles + failedFiles) / totalFiles * 100) : 100;
+        const running = ['queued', 'running'].includes(job.status);
         
         progressBar.value = progressPercent;
         document.querySelector('.progress-percent').textContent = `${progressPercent}%`;
@@ -352,7 +387,11 @@ class CompactVoiceGenerator {
         progressDetails.innerHTML = `
             <span class="success-count">成功: ${successFiles} 个文件</span>
             <span class="failed-count">失败: ${failedFiles} 个文件</span>
+            ${running ? '<button class="btn btn-secondary" id="cancelJobBtn">取消任务</button>' : ''}
         `;
+        if (running) {
+            document.getElementById('cancelJobBtn').addEventListener('click', () => this.cancelJob(job.job_id));
+        }
     }
 
     switchTab(tabName) {
@@ -247,13 +247,16 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify({ filename })
             });
             
-            if (!response.ok) {
-                throw new Error(`生成失败: ${response.status}`);
+            const result = await response.json();
+            
+            if (!response.ok || !result.success) {
+                throw new Error(result.error || `生成失败: ${response.status}`);
             }
             
-            const result = await response.json();
+            // 任务已提交，轮询进度直到结束
+            const job = await waitForJob(result.job_id, filename);
             
-            if (result.success) {
+            if (job.status === 'completed') {
                 showToast('语音生成完成！', 'success');
                 updateActivityItem(filename, '已完成', 'success');
                 
@@ -261,9 +264,16 @@ document.addEventListener('DOMContentLoaded', () => {
                 updatePreviewList(result.generated_files || []);
                 
                 // 显示生成结果
-                showGenerationResult(result);
+                showGenerationResult({
+                    successful: job.successful,
+                    failed: job.failed,
+                    duration: job.result ? `${job.result.summary.duration_seconds.toFixed(1)} 秒` : '未知'
+                });
+            } else if (job.status === 'cancelled') {
+                showToast(`任务已取消，已完成 ${job.completed}/${job.total_scripts} 条`, 'warning');
+                updateActivityItem(filename, '已取消', 'warning');
             } else {
-                throw new Error(result.error || '生成失败');
+                throw new Error(job.error || '生成失败');
             }
             
         } catch (error) {
@@ -273,6 +283,66 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
     
+    // 轮询任务进度直到结束；运行中在活动项上显示进度与取消按钮
+    const waitForJob = async (jobId, name) => {
+        try {
+            while (true) {
+                const response = await fetch(`/api/jobs/${jobId}`);
+                const job = await response.json();
+                if (!response.ok) {
+                    throw new Error(job.error || `查询任务失败: ${response.status}`);
+                }
+                if (['completed', 'failed', 'cancelled'].includes(job.status)) {
+                    return job;
+                }
+                updateActivityItem(name, `生成中 ${job.completed}/${job.total_scripts}`, 'info');
+                addCancelButton(name, jobId);
+                await new Promise(resolve => setTimeout(resolve, 1000));
+            }
+        } finally {
+            const item = findActivityItem(name);
+            const button = item && item.querySelector('.job-cancel');
+            if (button) {
+                button.remove();
+            }
+        }
+    };
+    
+    const findActivityItem = (name) => {
+        if (!activityFeed) return null;
+        for (const item of activityFeed.querySelectorAll('li')) {
+            const nameElement = item.querySelector('p');
+            if (nameElement && nameElement.textContent === name) {
+                return item;
+            }
+        }
+        return null;
+    };
+    
+    // 取消任务（已完成的音频与清单会保留）
+    const addCancelButton = (name, jobId) => {
+        const item = findActivityItem(name);
+        if (!item || item.querySelector('.job-cancel')) return;
+        const button = document.createElement('button');
+        button.className = 'chip subtle danger job-cancel';
+        button.textContent = '取消';
+        button.addEventListener('click', async () => {
+            button.disabled = true;
+            try {
+                const response = await fetch(`/api/jobs/${jobId}`, { method: 'DELETE' });
+                const result = await response.json();
+                if (!response.ok) {
+                    throw new Error(result.error || `取消失败: ${response.status}`);
+                }
+                showToast('正在取消任务...', 'info');
+            } catch (error) {
+                button.disabled = false;
+                showToast(`取消失败: ${error.message}`, 'error');
+            }
+        });
+        item.querySelector('div').appendChild(button);
+    };
+    
     // 显示生成结果
     const showGenerationResult = (result) => {
         const modal = createModal('生成完成', `
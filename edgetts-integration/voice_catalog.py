@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+EdgeTTS 语音目录缓存
+首次从 edge_tts.list_voices() 获取完整语音目录并写入磁盘，超过有效期后在
+后台线程刷新。TTS 服务、Web 控制台与 GUI 共用这一份目录：读取永远只查本地
+字典，不会等待网络。
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+import logging
+
+import edge_tts
+
+logger = logging.getLogger(__name__)
+
+# 目录缓存配置
+CATALOG_PATH = os.environ.get(
+    "TTS_VOICE_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "voice_catalog.json")
+)
+CATALOG_TTL = float(os.environ.get("TTS_VOICE_CATALOG_TTL_HOURS", "24")) * 3600  # 目录有效期（秒）
+CATALOG_RETRY_INTERVAL = 300  # 刷新失败后至少间隔多久再试（秒）
+
+# 语音模型池（人工整理的中文说明，与在线目录合并使用）
+VOICE_MODELS = {
+    # 女性语音模型
+    "en-US-AmandaMultilingualNeural": {"gender": "女性", "style": "Clear, Bright, Youthful", "name": "阿曼达", "description": "清晰、明亮、年轻"},
+    "en-US-AriaNeural": {"gender": "女性", "style": "Crisp, Bright, Clear", "name": "阿里亚", "description": "清脆、明亮、清晰"},
+    "en-US-AvaNeural": {"gender": "女性", "style": "Pleasant, Friendly, Caring", "name": "艾娃", "description": "令人愉悦、友好、关怀"},
+    "en-US-EmmaNeural": {"gender": "女性", "style": "Cheerful, Light-Hearted, Casual", "name": "艾玛", "description": "快乐、轻松、随意"},
+    "en-US-JennyNeural": {"gender": "女性", "style": "Sincere, Pleasant, Approachable", "name": "珍妮", "description": "真诚、愉快、易接近"},
+    "en-US-MichelleNeural": {"gender": "女性", "style": "Confident, Authentic, Warm", "name": "米歇尔", "description": "自信、真实、温暖"},
+    "en-US-NancyNeural": {"gender": "女性", "style": "Confident, Serious, Mature", "name": "南希", "description": "自信、严肃、成熟"},
+    "en-US-SerenaNeural": {"gender": "女性", "style": "Formal, Confident, Mature", "name": "塞雷娜", "description": "正式、自信、成熟"},
+    "en-US-AshleyNeural": {"gender": "女性", "style": "Sincere, Approachable, Honest", "name": "阿什莉", "description": "真诚、易接近、诚实"},
+
+    # 男性语音模型
+    "en-US-BrandonNeural": {"gender": "男性", "style": "Warm, Engaging, Authentic", "name": "布兰登", "description": "温暖、吸引人、真实"},
+    "en-US-KaiNeural": {"gender": "男性", "style": "Sincere, Pleasant, Bright, Clear, Friendly, Warm", "name": "凯", "description": "真诚、愉快、明亮、清晰、友好、温暖"},
+    "en-US-DavisNeural": {"gender": "男性", "style": "Soothing, Calm, Smooth", "name": "戴维斯", "description": "抚慰、平静、顺畅"},
+
+    # 中性语音模型
+    "en-US-FableNeural": {"gender": "中性", "style": "Casual, Friendly", "name": "传奇", "description": "随意、友好"}
+}
+
+# 情绪与语音模型映射
+EMOTION_VOICE_MAPPING = {
+    "Excited": ["en-US-AriaNeural", "en-US-EmmaNeural", "en-US-MichelleNeural"],
+    "Confident": ["en-US-NancyNeural", "en-US-SerenaNeural", "en-US-BrandonNeural"],
+    "Empathetic": ["en-US-AvaNeural", "en-US-JennyNeural", "en-US-AshleyNeural"],
+    "Calm": ["en-US-DavisNeural", "en-US-AvaNeural", "en-US-JennyNeural"],
+    "Playful": ["en-US-EmmaNeural", "en-US-AriaNeural", "en-US-FableNeural"],
+    "Urgent": ["en-US-MichelleNeural", "en-US-NancyNeural", "en-US-BrandonNeural"],
+    "Authoritative": ["en-US-SerenaNeural", "en-US-NancyNeural", "en-US-BrandonNeural"],
+    "Friendly": ["en-US-JennyNeural", "en-US-AvaNeural", "en-US-KaiNeural"],
+    "Inspirational": ["en-US-MichelleNeural", "en-US-BrandonNeural", "en-US-AriaNeural"],
+    "Serious": ["en-US-SerenaNeural", "en-US-NancyNeural", "en-US-DavisNeural"],
+    "Mysterious": ["en-US-DavisNeural", "en-US-SerenaNeural", "en-US-AvaNeural"],
+    "Grateful": ["en-US-JennyNeural", "en-US-AvaNeural", "en-US-AshleyNeural"]
+}
+
+GENDER_LABELS = {"Female": "女性", "Male": "男性"}
+
+def builtin_voices():
+    """在线目录不可用时的内置目录（仅包含人工整理的语音）"""
+    voices = {}
+    for short_name, info in VOICE_MODELS.items():
+        voices[short_name] = {
+            "ShortName": short_name,
+            "FriendlyName": f"{info['name']} - {info['style']}",
+            "Locale": "-".join(short_name.split("-")[:2]),
+            "Gender": {"女性": "Female", "男性": "Male"}.get(info["gender"], "Neutral")
+        }
+    return voices
+
+
+class VoiceCatalog:
+    """语音目录 - 磁盘缓存 + TTL + 后台刷新
+
+    voices() / get() / is_known() 只读内存字典；目录过期或尚未获取时会启动
+    后台线程刷新，刷新完成后通知 add_listener() 注册的回调。
+    """
+
+    def __init__(self, path=CATALOG_PATH, ttl=CATALOG_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.source = "builtin"  # builtin / disk / network
+        self.fetched_at = None
+        self.last_error = None
+        self.refreshes = 0
+        self._voices = builtin_voices()
+        self._listeners = []
+        self._loaded = False
+        self._refreshing = False
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """首次使用时读取磁盘缓存"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                voices = {v["ShortName"]: v for v in data.get("voices", []) if v.get("ShortName")}
+                if voices:
+                    self._voices = voices
+                    self.fetched_at = data.get("fetched_at")
+                    self.source = "disk"
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"语音目录缓存损坏，将重新获取: {str(e)}")
+
+    def is_stale(self):
+        self._load()
+        return self.fetched_at is None or time.time() - self.fetched_at > self.ttl
+
+    def ensure_fresh(self):
+        """目录过期时在后台刷新（不阻塞调用方）"""
+        if not self.is_stale():
+            return
+        with self._lock:
+            if self._refreshing or time.time() - self._last_attempt < CATALOG_RETRY_INTERVAL:
+                return
+            self._refreshing = True
+            self._last_attempt = time.time()
+        threading.Thread(target=self._refresh_in_background, name="voice-catalog-refresh", daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"语音目录后台刷新失败，继续使用{self.source}目录: {type(e).__name__}: {str(e)}")
+
+    def refresh(self):
+        """立即从网络获取目录并写入磁盘（阻塞），返回语音数量"""
+        with self._lock:
+            self._refreshing = True
+            self._last_attempt = time.time()
+        try:
+            voice_list = asyncio.run(edge_tts.list_voices())
+            voices = {v["ShortName"]: v for v in voice_list if v.get("ShortName")}
+            if not voices:
+                raise RuntimeError("语音目录为空")
+            fetched_at = time.time()
+            self._save(voice_list, fetched_at)
+            with self._lock:
+                self._voices = voices
+                self.fetched_at = fetched_at
+                self.source = "network"
+                self.last_error = None
+                self.refreshes += 1
+                self._loaded = True
+                listeners = list(self._listeners)
+            logger.info(f"语音目录已刷新: {len(voices)} 个语音")
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            self._refreshing = False
+
+        for listener in listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                logger.warning(f"语音目录刷新回调失败: {str(e)}")
+        return len(voices)
+
+    def _save(self, voice_list, fetched_at):
+        """原子写入磁盘缓存"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": fetched_at, "voices": voice_list}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def add_listener(self, callback):
+        """注册目录刷新完成后的回调，参数为本目录对象"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def voices(self):
+        """全部语音：ShortName -> 目录条目"""
+        self.ensure_fresh()
+        return self._voices
+
+    def get(self, short_name):
+        return self.voices().get(short_name)
+
+    def is_known(self, short_name):
+        """语音是否存在（本地字典查询）
+
+        只认内置语音与已获取的目录；在线目录尚未获取（首次启动或离线）时，
+        不在内置列表中的语音一律视为未知。
+        """
+        voices = self.voices()
+        return short_name in voices or short_name in VOICE_MODELS
+
+    def filter(self, locale_prefixes=()):
+        """按地区前缀筛选语音，结果按前缀顺序排列"""
+        voices = list(self.voices().values())
+        if not locale_prefixes:
+            return voices
+        ordered = []
+        for prefix in locale_prefixes:
+            ordered.extend(v for v in voices if v.get("Locale", "").startswith(prefix))
+        return ordered
+
+    def short_label(self, short_name):
+        """语音短名（如 zh-CN-XiaoxiaoNeural -> Xiaoxiao），用于文件名等场合"""
+        label = short_name.split("-", 2)[-1]
+        for suffix in ("MultilingualNeural", "Neural"):
+            if label.endswith(suffix) and label != suffix:
+                return label[:-len(suffix)]
+        return label
+
+    def describe(self, short_name):
+        """合并人工说明与在线目录信息"""
+        entry = dict(VOICE_MODELS.get(short_name, {}))
+        catalog_entry = self.get(short_name)
+        if catalog_entry:
+            entry.setdefault("gender", GENDER_LABELS.get(catalog_entry.get("Gender"), "未知"))
+            entry.setdefault("name", catalog_entry.get("FriendlyName", short_name))
+            personalities = catalog_entry.get("VoiceTag", {}).get("VoicePersonalities", [])
+            entry.setdefault("style", ", ".join(personalities) or "未知")
+            entry.setdefault("description", entry["style"])
+            entry["locale"] = catalog_entry.get("Locale")
+        return entry or None
+
+    def voice_models(self):
+        """全部语音的说明：ShortName -> describe()，人工整理的语音排在前面
+
+        在线目录尚未获取（首次启动或离线）时只有内置语音，即 VOICE_MODELS 本身。
+        """
+        voices = self.voices()
+        names = list(VOICE_MODELS) + [name for name in voices if name not in VOICE_MODELS]
+        return {name: self.describe(name) for name in names}
+
+    def stats(self):
+        self._load()
+        return {
+            "source": self.source,
+            "path": self.path,
+            "total_voices": len(self._voices),
+            "fetched_at": self.fetched_at,
+            "age_seconds": round(time.time() - self.fetched_at, 1) if self.fetched_at else None,
+            "ttl_seconds": self.ttl,
+            "refreshing": self._refreshing,
+            "refreshes": self.refreshes,
+            "last_error": self.last_error
+        }
+
+
+# 进程级共享目录
+VOICE_CATALOG = VoiceCatalog()